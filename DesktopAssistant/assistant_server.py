@@ -0,0 +1,170 @@
+import hmac
+import io
+import json
+import logging
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from command_scheduler import SchedulerBusy
+from tracing import tracer
+
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+
+class ApiError(Exception):
+    """An error reported to the client with an HTTP status"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def read_wav(body):
+    """Return (pcm, rate) from a 16-bit mono WAV body"""
+    try:
+        with wave.open(io.BytesIO(body), 'rb') as f:
+            if f.getsampwidth() != 2 or f.getnchannels() != 1:
+                raise ApiError(400, "Audio must be 16-bit mono WAV")
+            return f.readframes(f.getnframes()), f.getframerate()
+    except (wave.Error, EOFError) as e:
+        raise ApiError(400, f"Invalid WAV: {e or 'truncated file'}")
+
+
+class AssistantServer:
+    """Localhost HTTP API in front of the assistant so scripts and front-ends can share one loaded model.
+
+    POST /command  {"text": ..., "speak": false}  -> run_command(text, speak) result
+    POST /audio    16-bit mono WAV body (?speak=1) -> transcript plus the command result
+    GET  /health                                  -> health() result
+    GET  /metrics, /metrics.json                  -> stage latencies as Prometheus text or JSON
+
+    Each request is handled on its own thread; commands are queued on the command scheduler by run_command,
+    and audio is transcribed on the request thread so several clips decode in parallel.
+    """
+    def __init__(self, run_command, transcribe, health, host='127.0.0.1', port=8765, token=None):
+        self.run_command = run_command
+        self.transcribe = transcribe
+        self.health = health
+        self.token = token
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def address(self):
+        return self.httpd.server_address
+
+    def serve_forever(self):
+        logging.info(f"Assistant API listening on http://{self.address[0]}:{self.address[1]}")
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                self._dispatch(lambda path, query: server._get(path))
+
+            def do_POST(self):
+                self._dispatch(server._post)
+
+            def _dispatch(self, route):
+                start = time.perf_counter()
+                with server._lock:
+                    server.requests += 1
+                try:
+                    server._check_token(self.headers.get('Authorization', ''))
+                    path, _, query = self.path.partition('?')
+                    self.body = self._read_body() if self.command == 'POST' else b''
+                    result = route(path, query) if self.command == 'GET' else route(self, path, query)
+                    if result is None:
+                        raise ApiError(404, f"Unknown endpoint {path}")
+                    status = 200
+                except ApiError as e:
+                    status, result = e.status, {'error': str(e)}
+                except SchedulerBusy as e:
+                    status, result = 503, {'error': str(e)}
+                except TimeoutError as e:
+                    status, result = 504, {'error': str(e)}
+                except Exception as e:
+                    logging.error(f"API error on {self.path}: {e}")
+                    status, result = 500, {'error': str(e)}
+                self._send(status, result)
+                logging.info(f"API {self.command} {self.path}: {status} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+            def _read_body(self):
+                if self.headers.get('Transfer-Encoding'):
+                    raise ApiError(411, "Chunked bodies are not supported; send Content-Length")
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                except ValueError:
+                    raise ApiError(400, "Invalid Content-Length")
+                if length < 0:
+                    raise ApiError(400, "Invalid Content-Length")
+                if length > MAX_BODY_BYTES:
+                    raise ApiError(413, "Request body too large")
+                return self.rfile.read(length)
+
+            def _send(self, status, result):
+                if isinstance(result, str):
+                    data, content_type = result.encode('utf-8'), 'text/plain; version=0.0.4'
+                else:
+                    data, content_type = json.dumps(result).encode('utf-8'), 'application/json'
+                # After an error the request body may be unread; keeping the connection alive would parse it
+                # as the next request, so errors and GETs carrying a body always close the connection
+                if status >= 300 or (self.command != 'POST' and (self.headers.get('Content-Length', '0') != '0'
+                                                                 or self.headers.get('Transfer-Encoding'))):
+                    self.close_connection = True
+                self.send_response(status)
+                if self.close_connection:
+                    self.send_header('Connection', 'close')
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _check_token(self, header):
+        if self.token and not hmac.compare_digest(header.encode(), f"Bearer {self.token}".encode()):
+            raise ApiError(401, "Missing or wrong API token")
+
+    def _get(self, path):
+        if path == '/health':
+            return self.health()
+        if path == '/metrics':
+            return tracer.to_prometheus()
+        if path == '/metrics.json':
+            return tracer.snapshot()
+        return None
+
+    def _post(self, request, path, query):
+        if path == '/command':
+            try:
+                payload = json.loads(request.body or b'{}')
+            except ValueError:
+                raise ApiError(400, "Body must be JSON")
+            text = str(payload.get('text', '')).strip()
+            if not text:
+                raise ApiError(400, "Missing 'text'")
+            return self.run_command(text, bool(payload.get('speak', False)))
+        if path == '/audio':
+            pcm, rate = read_wav(request.body)
+            start = time.perf_counter()
+            transcript = self.transcribe(pcm, rate)
+            result = {'transcript': transcript, 'transcribe_ms': round((time.perf_counter() - start) * 1000)}
+            if transcript:
+                result.update(self.run_command(transcript, 'speak=1' in query.split('&')))
+            return result
+        return None
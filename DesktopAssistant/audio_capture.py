@@ -0,0 +1,514 @@
+import array
+import collections
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import json
+import logging
+import math
+import queue
+import threading
+import time
+
+from lazy_loader import lazy_import, log_timing_report, timed
+from tracing import tracer
+
+pyaudio = lazy_import('pyaudio')
+vosk = lazy_import('vosk')
+
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 1600  # 100 ms of 16-bit mono audio per read
+
+
+class RingBuffer:
+    """Bounded FIFO of audio chunks; the oldest chunk is dropped when a reader falls behind"""
+    def __init__(self, max_chunks):
+        self._chunks = collections.deque(maxlen=max_chunks)
+        self._cond = threading.Condition()
+        self.overruns = 0
+
+    def put(self, chunk):
+        with self._cond:
+            if len(self._chunks) == self._chunks.maxlen:
+                self.overruns += 1
+            self._chunks.append(chunk)
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._chunks:
+                self._cond.wait(timeout)
+            if self._chunks:
+                return self._chunks.popleft()
+            return None
+
+    def clear(self):
+        with self._cond:
+            self._chunks.clear()
+
+
+class CaptureEngine:
+    """Keeps a single microphone stream open and feeds it into a ring buffer from a reader thread"""
+    def __init__(self, rate=SAMPLE_RATE, chunk_size=CHUNK_SIZE, buffer_seconds=30):
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.buffer = RingBuffer(int(rate / chunk_size * buffer_seconds))
+        self._pa = None
+        self._stream = None
+        self._thread = None
+        self._running = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._running.is_set():
+                return
+            if self._stream is None:
+                self._pa = pyaudio.PyAudio()
+                self._stream = self._pa.open(format=pyaudio.paInt16, channels=1, rate=self.rate,
+                                             input=True, frames_per_buffer=self.chunk_size)
+                logging.info("Microphone stream opened")
+            self._stream.start_stream()
+            self.buffer.clear()
+            self._running.set()
+            self._thread = threading.Thread(target=self._reader, daemon=True)
+            self._thread.start()
+
+    def pause(self):
+        """Stop reading but keep the device open so the next start is instant"""
+        with self._lock:
+            if not self._running.is_set():
+                return
+            self._running.clear()
+        self._thread.join(timeout=2)
+        self._stream.stop_stream()
+
+    def close(self):
+        self.pause()
+        with self._lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._pa.terminate()
+                self._stream = None
+                self._pa = None
+                logging.info("Microphone stream closed")
+
+    def _reader(self):
+        while self._running.is_set():
+            try:
+                data = self._stream.read(self.chunk_size, exception_on_overflow=False)
+            except Exception as e:
+                logging.error(f"Microphone read error: {e}")
+                time.sleep(0.1)
+                continue
+            self.buffer.put(data)
+
+
+class Utterance:
+    """Speech segment that recognizers can read while it is still being captured"""
+    def __init__(self, chunk_ms):
+        self.chunk_ms = chunk_ms
+        self._chunks = []
+        self._cond = threading.Condition()
+        self.closed = False
+        self.closed_at = None
+        self.offset = 0  # leading bytes decoders skip, e.g. a detected wake phrase
+
+    def append(self, chunk):
+        with self._cond:
+            self._chunks.append(chunk)
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self.closed_at = time.perf_counter()
+            self._cond.notify_all()
+
+    def chunks(self, cancel=None):
+        """Yield every chunk from offset on, blocking until more audio arrives, the utterance ends or cancel is set"""
+        i = 0
+        skip = self.offset
+        while True:
+            with self._cond:
+                while i >= len(self._chunks) and not self.closed:
+                    if cancel is not None and cancel.is_set():
+                        return
+                    self._cond.wait(0.1)
+                if i >= len(self._chunks) or (cancel is not None and cancel.is_set()):
+                    return
+                chunk = self._chunks[i]
+            i += 1
+            if skip >= len(chunk):
+                skip -= len(chunk)
+                continue
+            yield chunk[skip:] if skip else chunk
+            skip = 0
+
+    @property
+    def duration_ms(self):
+        return len(self._chunks) * self.chunk_ms
+
+    @property
+    def audio(self):
+        with self._cond:
+            return b''.join(self._chunks)[self.offset:]
+
+
+def chunk_rms(chunk):
+    samples = array.array('h', chunk)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class Endpointer:
+    """Energy-based voice activity detector that cuts the capture stream into utterances"""
+    def __init__(self, rate=SAMPLE_RATE, chunk_size=CHUNK_SIZE, threshold=500, silence_ms=700,
+                 min_speech_ms=200, preroll_ms=300, max_utterance_ms=15000):
+        self.chunk_ms = chunk_size * 1000 / rate
+        self.threshold = threshold
+        self.silence_ms = silence_ms
+        self.min_speech_ms = min_speech_ms
+        self.max_utterance_ms = max_utterance_ms
+        self._pending = collections.deque(maxlen=max(1, math.ceil((preroll_ms + min_speech_ms) / self.chunk_ms)))
+        self._voiced_ms = 0
+        self._silent_ms = 0
+        self.current = None
+        self.processed_ms = 0
+        self.dropped_ms = 0
+
+    def process(self, chunk):
+        """Feed one chunk; returns a newly started Utterance, or None"""
+        voiced = chunk_rms(chunk) >= self.threshold
+        if self.current is not None:
+            self.current.append(chunk)
+            self.processed_ms += self.chunk_ms
+            self._silent_ms = 0 if voiced else self._silent_ms + self.chunk_ms
+            if self._silent_ms >= self.silence_ms or self.current.duration_ms >= self.max_utterance_ms:
+                self.end()
+            return None
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped_ms += self.chunk_ms
+        self._pending.append(chunk)
+        self._voiced_ms = self._voiced_ms + self.chunk_ms if voiced else 0
+        if self._voiced_ms < self.min_speech_ms:
+            return None
+        self.current = Utterance(self.chunk_ms)
+        for pending in self._pending:
+            self.current.append(pending)
+            self.processed_ms += self.chunk_ms
+        self._pending.clear()
+        self._voiced_ms = 0
+        self._silent_ms = 0
+        return self.current
+
+    def end(self):
+        """Close the utterance in progress, if any"""
+        if self.current is None:
+            return
+        utterance = self.current
+        self.current = None
+        utterance.close()
+        logging.info(f"Endpoint: {utterance.duration_ms:.0f} ms utterance "
+                     f"(total processed {self.processed_ms:.0f} ms, dropped {self.dropped_ms:.0f} ms of silence)")
+
+
+class WakeWordGate:
+    """Cheap first pass over each utterance with a Vosk recognizer restricted to the wake phrase.
+
+    Utterances only reach the full recognizer if the phrase is heard in their first scan_ms, or if they
+    start within window_ms of the last wake or command. Higher sensitivity accepts lower confidence.
+    """
+    def __init__(self, phrase='ovo', sensitivity=0.5, window_ms=8000, scan_ms=2000):
+        self.phrase = phrase.lower().strip()
+        self.words = self.phrase.split()
+        self.min_confidence = 1.0 - sensitivity
+        self.window_ms = window_ms
+        self.scan_ms = scan_ms
+        self.checked = 0
+        self.detected = 0
+        self._model = None
+        self._rate = None
+        self._open_until = 0.0
+
+    def load(self, model, rate):
+        """Build the restricted recognizer; raises ValueError if the phrase is not in the model's vocabulary"""
+        # Vosk silently drops unknown grammar words, which would reject every utterance without an error
+        missing = [word for word in self.words if model.find_word(word) < 0]
+        if missing:
+            raise ValueError(f"wake phrase {self.phrase!r}: {', '.join(missing)} not in the Vosk model's vocabulary")
+        self._model = model
+        self._rate = rate
+
+    def unload(self):
+        self._model = None
+
+    @property
+    def awake(self):
+        return time.monotonic() < self._open_until
+
+    def extend(self):
+        """Keep listening without the wake phrase for another window_ms"""
+        self._open_until = time.monotonic() + self.window_ms / 1000
+
+    def detect(self, utterance):
+        """Return where the wake phrase ends in utterance (seconds), or None if it is not heard at its start"""
+        self.checked += 1
+        # A fresh recognizer per utterance: Vosk word times count from the start of the recognizer's
+        # stream and Reset() does not zero them, so a reused one would place the phrase too late
+        rec = vosk.KaldiRecognizer(self._model, self._rate, json.dumps([self.phrase, "[unk]"]))
+        rec.SetWords(True)
+        max_chunks = max(1, int(self.scan_ms / utterance.chunk_ms))
+        for i, data in enumerate(utterance.chunks()):
+            rec.AcceptWaveform(data)
+            if i + 1 >= max_chunks:
+                break
+        words = json.loads(rec.FinalResult()).get('result', [])
+        heard = [w for w in words if w.get('word') in self.words]
+        confidence = min((w.get('conf', 0.0) for w in heard), default=0.0)
+        detected = len(heard) >= len(self.words) and confidence >= self.min_confidence
+        if detected:
+            self.detected += 1
+            self.extend()
+        logging.info(f"Wake word {'detected' if detected else 'not detected'} (confidence {confidence:.2f}, "
+                     f"{self.detected}/{self.checked} utterances)")
+        return max(w.get('end', 0.0) for w in heard) if detected else None
+
+
+class SpeechPipeline:
+    """Segments audio from a CaptureEngine with an Endpointer and decodes each utterance on a background thread"""
+    def __init__(self, capture, endpointer, mode='offline', vosk_model_path=None, cloud=None, notify=None,
+                 min_confidence=0.6, on_speech_start=None, wake_gate=None, on_wake=None):
+        self.capture = capture
+        self.endpointer = endpointer
+        self.mode = mode
+        self.vosk_model_path = vosk_model_path
+        self.cloud = cloud
+        self.notify = notify or (lambda text: None)
+        self.min_confidence = min_confidence
+        self.on_speech_start = on_speech_start
+        self.wake_gate = wake_gate
+        self.on_wake = on_wake
+        self._decoding = threading.Event()
+        self.utterances = queue.Queue()
+        self._segments = queue.Queue()
+        self._vosk_model = None
+        self._rec = None
+        self._load_lock = threading.Lock()
+        self._threads = []
+        self._running = threading.Event()
+        self._race_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='recognizer')
+
+    def load(self):
+        """Load the Vosk model once and warm the cloud channel; later starts reuse both"""
+        with self._load_lock:
+            if (self.mode in ('offline', 'hybrid') or self.wake_gate is not None) and self._vosk_model is None:
+                with timed("load Vosk model"):
+                    self._vosk_model = vosk.Model(self.vosk_model_path)
+                self._rec = vosk.KaldiRecognizer(self._vosk_model, self.capture.rate)
+                self._rec.SetWords(True)
+                if self.wake_gate is not None:
+                    try:
+                        self.wake_gate.load(self._vosk_model, self.capture.rate)
+                    except ValueError as e:
+                        logging.error(f"Wake word disabled: {e}")
+                        self.notify(f"The wake word {self.wake_gate.phrase} is not in the speech model's "
+                                    f"vocabulary, so I'm listening without it.")
+                        self.wake_gate = None
+                logging.info(f"Vosk model loaded: {self.vosk_model_path}")
+                log_timing_report()  # without a warm-up this is the first model load
+            if self.mode in ('cloud', 'hybrid') and self.cloud is not None:
+                self.cloud.warm_up()
+
+    @property
+    def loaded(self):
+        return self._vosk_model is not None
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    def unload(self):
+        """Free the Vosk model while not listening; load() or start() brings it back"""
+        with self._load_lock:
+            if self._running.is_set() or self._vosk_model is None:
+                return False
+            self._rec = None
+            self._vosk_model = None
+            if self.wake_gate is not None:
+                self.wake_gate.unload()
+        logging.info(f"Vosk model unloaded: {self.vosk_model_path}")
+        return True
+
+    def start(self):
+        if self._running.is_set():
+            return
+        self.load()
+        self.capture.start()
+        self._running.set()
+        self._threads = [threading.Thread(target=self._segment, daemon=True),
+                         threading.Thread(target=self._decode, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._running.clear()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self.capture.pause()
+
+    def get_utterance(self, timeout=None):
+        """Return (command, trace_id) for the next recognized utterance, or (None, None) on timeout"""
+        try:
+            return self.utterances.get(timeout=timeout)
+        except queue.Empty:
+            return None, None
+
+    def transcribe(self, pcm, rate=SAMPLE_RATE):
+        """Transcribe a complete 16-bit mono PCM clip on the calling thread, independently of live capture"""
+        self.load()
+        if self._vosk_model is not None:
+            rec = vosk.KaldiRecognizer(self._vosk_model, rate)
+            rec.AcceptWaveform(pcm)
+            return json.loads(rec.FinalResult()).get('text', '').lower()
+        if self.cloud is None:
+            raise RuntimeError("No recognizer available")
+        if rate != self.cloud.rate:
+            raise ValueError(f"Cloud recognition expects {self.cloud.rate} Hz audio, got {rate} Hz")
+        step = self.capture.chunk_size * 2
+        command, _ = self.cloud.recognize(pcm[i:i + step] for i in range(0, len(pcm), step))
+        return command
+
+    @property
+    def idle(self):
+        """True when no utterance is being or waiting to be decoded"""
+        return self._segments.empty() and not self._decoding.is_set()
+
+    def metrics(self):
+        metrics = {
+            'processed_ms': self.endpointer.processed_ms,
+            'dropped_ms': self.endpointer.dropped_ms,
+            'buffer_overruns': self.capture.buffer.overruns,
+        }
+        if self.wake_gate is not None:
+            metrics.update(wake_checked=self.wake_gate.checked, wake_detected=self.wake_gate.detected)
+        return metrics
+
+    def _segment(self):
+        while self._running.is_set():
+            data = self.capture.buffer.get(timeout=0.5)
+            if data is None:
+                continue
+            utterance = self.endpointer.process(data)
+            if utterance is not None:
+                if self.on_speech_start is not None and (self.wake_gate is None or self.wake_gate.awake):
+                    self.on_speech_start()
+                self._segments.put(utterance)
+        self.endpointer.end()
+
+    def _decode(self):
+        while self._running.is_set() or not self._segments.empty():
+            try:
+                utterance = self._segments.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self._decoding.set()
+            try:
+                self._decode_utterance(utterance)
+            finally:
+                self._decoding.clear()
+
+    def _decode_utterance(self, utterance):
+        gated = self.wake_gate is not None and self._vosk_model is not None
+        woken = False
+        if gated and not self.wake_gate.awake:
+            with tracer.span('wake_check'):
+                wake_end = self.wake_gate.detect(utterance)
+            if wake_end is None:
+                return
+            woken = True
+            # Decoders start after the wake phrase, however the full recognizer would have spelled it
+            utterance.offset = int(wake_end * self.capture.rate) * 2
+            if self.on_speech_start is not None:
+                self.on_speech_start()
+        if self.mode == 'hybrid':
+            command = self._decode_hybrid(utterance)
+        elif self.mode == 'offline':
+            try:
+                command, _ = self._decode_offline(utterance)
+            except Exception as e:
+                logging.error(f"Vosk error: {e}")
+                if self.cloud is None:
+                    return
+                self.notify("Error with offline recognition. Trying cloud...")
+                self.mode = 'cloud'
+                command = self._decode_cloud(utterance)
+        else:
+            command = self._decode_cloud(utterance)
+        if gated:
+            if command:
+                # Every command keeps the window open so follow-ups need no wake phrase
+                self.wake_gate.extend()
+            elif woken:
+                if self.on_wake is not None:
+                    self.on_wake()
+                return
+        # Decode latency is measured from the end of speech, since decoding streams while the user talks
+        ended = utterance.closed_at or time.perf_counter()
+        trace_id = tracer.new_trace('voice', command, started_at=ended) if command else None
+        tracer.record('capture', utterance.duration_ms, trace_id)
+        tracer.record('decode', (time.perf_counter() - ended) * 1000, trace_id)
+        if command:
+            self.utterances.put((command, trace_id))
+
+    def _decode_offline(self, utterance, cancel=None):
+        """Return the Vosk transcript and its mean word confidence"""
+        self._rec.Reset()
+        for data in utterance.chunks(cancel):
+            self._rec.AcceptWaveform(data)
+        result = json.loads(self._rec.FinalResult())
+        if cancel is not None and cancel.is_set():
+            return '', 0.0
+        command = result.get('text', '').lower()
+        words = result.get('result', [])
+        confidence = sum(w.get('conf', 0.0) for w in words) / len(words) if words else 0.0
+        logging.info(f"Recognized (offline): {command}")
+        return command, confidence
+
+    def _decode_cloud(self, utterance):
+        try:
+            command, _ = self.cloud.recognize(utterance.chunks())
+            return command
+        except Exception as e:
+            self.notify("Cloud recognition failed.")
+            logging.error(f"Cloud recognition error: {e}")
+            return ''
+
+    def _decode_hybrid(self, utterance):
+        """Run Vosk and cloud on the same audio; the first confident transcript wins and the other is cancelled"""
+        cancel = threading.Event()
+        offline = self._race_pool.submit(self._decode_offline, utterance, cancel)
+        backends = {
+            offline: 'offline',
+            self._race_pool.submit(self.cloud.recognize, utterance.chunks(cancel)): 'cloud',
+        }
+        pending = set(backends)
+        fallback = ''
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    command, confidence = future.result()
+                except Exception as e:
+                    logging.error(f"{backends[future].capitalize()} recognition error: {e}")
+                    continue
+                if command and confidence >= self.min_confidence:
+                    cancel.set()
+                    # The shared KaldiRecognizer is not thread-safe: the cancelled Vosk pass must finish before
+                    # the next utterance can Reset() it. It stops at the next chunk, so this wait is short.
+                    wait([offline])
+                    logging.info(f"Hybrid recognition won by {backends[future]} ({confidence:.2f}): {command}")
+                    return command
+                fallback = fallback or command
+        if fallback:
+            logging.info(f"Hybrid recognition below confidence threshold, using: {fallback}")
+        return fallback
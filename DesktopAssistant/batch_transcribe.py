@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+FRAMES_PER_READ = 4000
+
+_model = None
+
+
+def _init_worker(model_path):
+    """Load one Vosk model per worker process; recognizers are created per file"""
+    global _model
+    import vosk
+    vosk.SetLogLevel(-1)
+    _model = vosk.Model(model_path)
+
+
+def transcribe_file(entry):
+    """Decode one WAV file in a worker and return its result record"""
+    import vosk
+    result = dict(entry)
+    start = time.perf_counter()
+    try:
+        with wave.open(entry['path'], 'rb') as f:
+            if f.getsampwidth() != 2 or f.getnchannels() != 1:
+                raise ValueError("expected 16-bit mono WAV")
+            rate = f.getframerate()
+            audio_seconds = f.getnframes() / rate
+            rec = vosk.KaldiRecognizer(_model, rate)
+            rec.SetWords(True)
+            data = f.readframes(FRAMES_PER_READ)
+            while data:
+                rec.AcceptWaveform(data)
+                data = f.readframes(FRAMES_PER_READ)
+        decoded = json.loads(rec.FinalResult())
+        words = decoded.get('result', [])
+        decode_seconds = time.perf_counter() - start
+        result.update(
+            transcript=decoded.get('text', '').lower(),
+            confidence=round(sum(w.get('conf', 0.0) for w in words) / len(words), 3) if words else 0.0,
+            audio_seconds=round(audio_seconds, 3),
+            decode_ms=round(decode_seconds * 1000, 1),
+            real_time_factor=round(decode_seconds / audio_seconds, 3) if audio_seconds else None,
+        )
+    except Exception as e:
+        result.update(error=str(e), decode_ms=round((time.perf_counter() - start) * 1000, 1))
+    return result
+
+
+def word_error_rate(reference, hypothesis):
+    """Levenshtein distance over words divided by the reference length"""
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+    return row[-1] / len(ref) if ref else float(bool(hyp))
+
+
+def load_entries(source):
+    """Entries from a directory of .wav files or a manifest: one path per line, or JSONL with
+    "path" and optional expected "text" and "intent" (relative paths are relative to the manifest)"""
+    if os.path.isdir(source):
+        return [{'path': os.path.join(source, name)} for name in sorted(os.listdir(source))
+                if name.lower().endswith('.wav')]
+    base = os.path.dirname(os.path.abspath(source))
+    entries = []
+    with open(source, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            entry = json.loads(line) if line.startswith('{') else {'path': line}
+            entry['path'] = os.path.join(base, entry['path'])
+            entries.append(entry)
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe WAV files with Vosk on a process pool and write JSONL results")
+    parser.add_argument("source", help="directory of .wav files or a manifest file")
+    parser.add_argument("--model", default=os.getenv('VOSK_MODEL_PATH', 'vosk-model-small-en-us-0.15'))
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes, one model each")
+    parser.add_argument("--route", action="store_true", help="also route transcripts through the intent router")
+    parser.add_argument("--output", help="JSONL output file (default: stdout)")
+    args = parser.parse_args()
+
+    entries = load_entries(args.source)
+    if not entries:
+        sys.exit(f"No WAV files found in {args.source}")
+    if args.route:
+        from intent_router import router
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    wers, intents_correct, intents_total, errors, audio_total = [], 0, 0, 0, 0.0
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.model,)) as pool:
+            for result in pool.map(transcribe_file, entries, chunksize=4):
+                if 'error' in result:
+                    errors += 1
+                else:
+                    audio_total += result['audio_seconds']
+                    if 'text' in result:
+                        result['wer'] = round(word_error_rate(result['text'], result['transcript']), 3)
+                        wers.append(result['wer'])
+                    if args.route:
+                        result['routed_intent'], result['slots'] = router.route(result['transcript'])
+                        if 'intent' in result:
+                            intents_total += 1
+                            intents_correct += result['routed_intent'] == result['intent']
+                out.write(json.dumps(result) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    summary = (f"{len(entries)} files ({errors} errors), {audio_total:.1f} s audio in {elapsed:.1f} s "
+               f"with {args.workers} workers: {audio_total / elapsed:.1f}x real time")
+    if wers:
+        summary += f", mean WER {sum(wers) / len(wers):.3f} over {len(wers)} files"
+    if intents_total:
+        summary += f", intent accuracy {intents_correct}/{intents_total}"
+    print(summary, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+import argparse
+import array
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import types
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmark_llm import rss_mb as peak_rss_mb
+from tracing import Histogram
+
+# Commands driven through the assistant's command path; LLM prompts fall through the router
+COMMANDS = [
+    "what time is it",
+    "current weather in nairobi",
+    "weather forecast in london",
+    "latest news",
+    "tell me a joke",
+    "set reminder stretch in 30 minutes",
+    "hello ovo",
+    "what is the best way to learn a new language",
+    "can you recommend a good book",
+]
+
+TINY_LM_CORPUS = [
+    "hello how are you today", "what do you like to do on weekends", "can you recommend a good book",
+    "the weather is nice and sunny", "learning a new language takes practice every day",
+    "i like reading books and walking in the park", "tell me something interesting about space",
+] * 20
+
+
+class NullEngine:
+    """pyttsx3 stand-in: accepts every call and produces no audio"""
+    def __init__(self):
+        self.properties = {'rate': 150, 'volume': 0.9, 'voice': None}
+        self.spoken = 0
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def getProperty(self, name):
+        return self.properties.get(name)
+
+    def say(self, text):
+        self.spoken += 1
+
+    def save_to_file(self, text, path):
+        pass
+
+    def runAndWait(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    """Answers weatherapi.com and newsapi.org paths with canned JSON after a fixed delay"""
+    delay = 0.05
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        path = self.path.split('?')[0]
+        condition = {'text': 'Partly cloudy'}
+        if path.endswith('/current.json'):
+            body = {'location': {'name': 'Nairobi'}, 'current': {'temp_c': 21.5, 'condition': condition}}
+        elif path.endswith('/forecast.json'):
+            days = [{'date': f"2024-01-0{i}", 'day': {'maxtemp_c': 24.0, 'mintemp_c': 12.0, 'condition': condition}}
+                    for i in range(1, 4)]
+            body = {'location': {'name': 'London'}, 'forecast': {'forecastday': days}}
+        elif path.endswith('/top-headlines'):
+            body = {'articles': [{'title': f"Headline {i}"} for i in range(1, 6)]}
+        else:
+            self.send_error(404)
+            return
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_api(delay_ms):
+    FakeApiHandler.delay = delay_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeApiHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_tiny_lm(path):
+    """Save a seeded two-layer GPT-2 with a small byte-level BPE tokenizer, so runs need no download"""
+    if os.path.isdir(path) and os.path.exists(os.path.join(path, 'config.json')):
+        return path
+    import torch
+    import transformers
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(vocab_size=512, special_tokens=["<|endoftext|>"],
+                                  initial_alphabet=pre_tokenizers.ByteLevel.alphabet())
+    tokenizer.train_from_iterator(TINY_LM_CORPUS, trainer)
+    fast = transformers.PreTrainedTokenizerFast(tokenizer_object=tokenizer, eos_token="<|endoftext|>",
+                                                bos_token="<|endoftext|>", unk_token="<|endoftext|>")
+    fast.save_pretrained(path)
+    eos_id = fast.eos_token_id
+    config = transformers.GPT2Config(vocab_size=len(fast), n_positions=1024, n_embd=64, n_layer=2, n_head=2,
+                                     bos_token_id=eos_id, eos_token_id=eos_id)
+    torch.manual_seed(0)
+    transformers.GPT2LMHeadModel(config).save_pretrained(path)
+    return path
+
+
+def load_clips(directory, rate):
+    """16-bit mono clips from directory, or synthetic noise bursts that the endpointer treats as speech"""
+    if directory:
+        clips = []
+        for name in sorted(os.listdir(directory)):
+            if name.lower().endswith('.wav'):
+                with wave.open(os.path.join(directory, name), 'rb') as f:
+                    if f.getframerate() == rate and f.getsampwidth() == 2 and f.getnchannels() == 1:
+                        clips.append(f.readframes(f.getnframes()))
+        return clips
+    rng = random.Random(0)
+    return [array.array('h', (int(rng.gauss(0, 3000)) for _ in range(int(rate * 1.2)))).tobytes() for _ in range(5)]
+
+
+class FileCapture:
+    """CaptureEngine stand-in that plays clips, separated by silence, into the ring buffer at speed x real time"""
+    def __init__(self, clips, rate, chunk_size, speed=4.0, gap_seconds=1.0):
+        from audio_capture import RingBuffer
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.buffer = RingBuffer(int(rate / chunk_size * 30))
+        self.clips = clips
+        self.speed = speed
+        self.gap = bytes(int(rate * gap_seconds) * 2)
+        self.finished = threading.Event()
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._feed, daemon=True).start()
+
+    def _feed(self):
+        step = self.chunk_size * 2
+        interval = self.chunk_size / self.rate / self.speed
+        for clip in self.clips:
+            audio = self.gap + clip + self.gap
+            for i in range(0, len(audio) - step + 1, step):
+                if self._stop.is_set():
+                    return
+                self.buffer.put(audio[i:i + step])
+                time.sleep(interval)
+        self.finished.set()
+
+    def pause(self):
+        self._stop.set()
+
+    def close(self):
+        self._stop.set()
+
+
+def summarize(histogram):
+    quantiles = histogram.quantiles()
+    return {'count': histogram.count, 'mean_ms': round(histogram.total / max(histogram.count, 1), 1),
+            **{f"p{int(q * 100)}_ms": round(v, 1) for q, v in quantiles.items()}}
+
+
+def prepare_environment(args, workdir):
+    """Point the assistant at the null TTS, fake APIs, tiny LM and a throwaway home before it is imported"""
+    sys.modules['pyttsx3'] = types.SimpleNamespace(init=lambda *a, **k: NullEngine())
+    home = os.path.join(workdir, 'home')
+    os.makedirs(home, exist_ok=True)
+    open(os.path.join(workdir, '.env'), 'w').close()
+    api = start_fake_api(args.http_delay_ms)
+    base = f"http://127.0.0.1:{api.server_address[1]}"
+    os.environ.update({
+        'HOME': home, 'USERPROFILE': home, 'APPDATA': home,
+        'WEATHER_API_BASE': f"{base}/v1", 'NEWS_API_BASE': f"{base}/v2",
+        'WEATHER_API_KEY': 'bench', 'NEWS_API_KEY': 'bench',
+        'LLM_MODEL_PATH': args.llm_path or build_tiny_lm(os.path.join(workdir, 'tiny-lm')),
+        'LLM_PRECISION': args.precision, 'LLM_BATCH_SIZE': str(args.llm_batch),
+        'RECOGNITION_MODE': 'offline', 'VOSK_MODEL_PATH': args.vosk_model,
+        'WARMUP_ON_START': 'false', 'BARGE_IN_ON_SPEECH': 'false', 'TTS_CACHE_MB': '0',
+    })
+    if not args.cache:
+        os.environ.update({'RESPONSE_CACHE_SIZE': '0', 'WEATHER_CACHE_TTL': '0', 'FORECAST_CACHE_TTL': '0',
+                           'NEWS_CACHE_TTL': '0'})
+    os.chdir(workdir)
+    return api
+
+
+def run_audio(assistant, args):
+    """Feed clips through the endpointer and Vosk; returns per-utterance decode latency and the transcripts"""
+    from audio_capture import CHUNK_SIZE, SAMPLE_RATE
+    pipeline = assistant.get_speech_pipeline()
+    if pipeline.mode != 'offline':
+        return {'skipped': f"Vosk model not found at {args.vosk_model}"}, []
+    start = time.perf_counter()
+    pipeline.load()
+    load_ms = (time.perf_counter() - start) * 1000
+    pipeline.capture = FileCapture(load_clips(args.audio, SAMPLE_RATE), SAMPLE_RATE, CHUNK_SIZE, speed=args.audio_speed)
+    transcripts = []
+    pipeline.start()
+    idle_since = None
+    while True:
+        command, _ = pipeline.get_utterance(0.2)
+        if command:
+            transcripts.append(command)
+        if pipeline.capture.finished.is_set():
+            idle_since = idle_since or time.perf_counter()
+            if time.perf_counter() - idle_since > 2:
+                break
+    pipeline.stop()
+    decode = assistant.tracer.snapshot()['stages'].get('decode', {})
+    return {'recognizer_load_ms': round(load_ms), 'utterances': decode.get('count', 0),
+            'transcripts': transcripts, 'decode': decode, 'metrics': pipeline.metrics()}, transcripts
+
+
+class NullChat:
+    """ChatView stand-in for a window that is never drawn"""
+    def append(self, text):
+        pass
+
+
+def run_desktop_command(assistant, command):
+    """Run command through AssistantGUI.handle_user_command, as typed input does, and wait for its job.
+
+    The real method runs on a bare instance without Tk, so LLM prompts stream through the desktop
+    ConversationSession and every reply is spoken through the TTS thread (to the NullEngine).
+    Returns 'ok', 'error' or 'rejected'.
+    """
+    gui = object.__new__(assistant.AssistantGUI)
+    gui.chat = NullChat()
+    done = threading.Event()
+    outcome = ['ok']
+
+    def on_job_done(future):
+        if future.cancelled() or future.exception() is not None:
+            outcome[0] = 'error'
+        done.set()
+
+    def add_message(text, is_user=False):
+        if text.startswith("I'm still busy"):
+            outcome[0] = 'rejected'
+            done.set()
+        elif text == "I don't understand that command.":
+            done.set()
+
+    gui.on_job_done = on_job_done
+    gui.add_message = add_message
+    gui.handle_user_command(command)
+    done.wait()
+    return outcome[0]
+
+
+def run_api_command(assistant, command):
+    """Run command the way the headless API does (stateless LLM answers, nothing spoken)"""
+    from command_scheduler import SchedulerBusy
+    try:
+        assistant.run_command(command)
+    except SchedulerBusy:
+        return 'rejected'
+    except Exception:
+        return 'error'
+    return 'ok'
+
+
+def run_commands(assistant, commands, rounds, concurrency, run=run_desktop_command):
+    """Run every command rounds times with concurrency client threads; returns latencies and throughput"""
+    from intent_router import router
+    per_intent, overall = {}, Histogram(window=100000)
+    rejected, errors = 0, 0
+    lock = threading.Lock()
+
+    def one(command):
+        nonlocal rejected, errors
+        start = time.perf_counter()
+        outcome = run(assistant, command)
+        ms = (time.perf_counter() - start) * 1000
+        with lock:
+            if outcome == 'rejected':
+                rejected += 1
+            elif outcome == 'error':
+                errors += 1
+            else:
+                per_intent.setdefault(router.route(command)[0] or 'llm', Histogram(window=100000)).add(ms)
+                overall.add(ms)
+
+    workload = [command for _ in range(rounds) for command in commands]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, workload))
+    elapsed = time.perf_counter() - start
+    return {
+        'concurrency': concurrency,
+        'commands': len(workload),
+        'rejected': rejected,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'throughput_per_s': round(overall.count / elapsed, 2),
+        'latency': summarize(overall),
+        'per_intent': {intent: summarize(h) for intent, h in sorted(per_intent.items())},
+    }
+
+
+def compare(result, baseline, tolerance):
+    """Return regressions of p95 latency or throughput beyond tolerance (a fraction) against baseline"""
+    regressions = []
+    for phase in ('sequential', 'concurrent', 'api'):
+        new, old = result.get(phase), baseline.get(phase)
+        if not new or not old:
+            continue
+        if new['throughput_per_s'] < old['throughput_per_s'] * (1 - tolerance):
+            regressions.append(f"{phase} throughput {old['throughput_per_s']} -> {new['throughput_per_s']}/s")
+        for intent, stats in new['per_intent'].items():
+            before = old['per_intent'].get(intent)
+            if before and stats['p95_ms'] > before['p95_ms'] * (1 + tolerance) + 1:
+                regressions.append(f"{phase} {intent} p95 {before['p95_ms']} -> {stats['p95_ms']} ms")
+    if result['startup']['import_ms'] > baseline['startup']['import_ms'] * (1 + tolerance) + 50:
+        regressions.append(f"import {baseline['startup']['import_ms']} -> {result['startup']['import_ms']} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the command path with stubbed TTS, HTTP and a tiny LM")
+    parser.add_argument("--llm-path", help="model directory to use instead of the generated tiny GPT-2")
+    parser.add_argument("--precision", default="fp32", choices=["fp32", "bf16", "int8"])
+    parser.add_argument("--vosk-model", default=os.path.abspath(os.getenv('VOSK_MODEL_PATH', 'vosk-model-small-en-us-0.15')))
+    parser.add_argument("--audio", help="directory of 16 kHz mono WAV clips (default: synthetic noise bursts)")
+    parser.add_argument("--audio-speed", type=float, default=4.0, help="playback speed relative to real time")
+    parser.add_argument("--llm-batch", type=int, default=1, help="LLM_BATCH_SIZE for the API phase (1 = no batching)")
+    parser.add_argument("--rounds", type=int, default=5, help="passes over the command mix")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads in the concurrent phase")
+    parser.add_argument("--http-delay-ms", type=float, default=50, help="latency of the fake weather/news server")
+    parser.add_argument("--cache", action="store_true", help="keep the HTTP and response caches enabled")
+    parser.add_argument("--save", help="write the results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown as a fraction")
+    args = parser.parse_args()
+    for name in ('llm_path', 'audio', 'save', 'compare'):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    process_start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix='ovo-bench-') as workdir:
+        api = prepare_environment(args, workdir)
+        start = time.perf_counter()
+        import desktopAssistant as assistant
+        import_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        if not assistant.llm.load():
+            sys.exit(f"Could not load the language model from {os.environ['LLM_MODEL_PATH']}")
+        llm_load_ms = (time.perf_counter() - start) * 1000
+        ready_ms = (time.perf_counter() - process_start) * 1000
+
+        audio, transcripts = run_audio(assistant, args)
+        sequential = run_commands(assistant, COMMANDS + transcripts, args.rounds, 1)
+        concurrent = run_commands(assistant, COMMANDS + transcripts, args.rounds, args.concurrency)
+        api_phase = run_commands(assistant, COMMANDS + transcripts, args.rounds, args.concurrency, run_api_command)
+        result = {
+            'startup': {'import_ms': round(import_ms), 'llm_load_ms': round(llm_load_ms), 'ready_ms': round(ready_ms)},
+            'audio': audio,
+            'sequential': sequential,
+            'concurrent': concurrent,
+            'api': api_phase,
+            'stages': assistant.tracer.snapshot()['stages'],
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'settings': {'precision': args.precision, 'rounds': args.rounds, 'http_delay_ms': args.http_delay_ms,
+                         'llm_batch': args.llm_batch, 'cache': args.cache, 'llm': args.llm_path or 'tiny-gpt2'},
+        }
+        assistant.reminders.close()
+        assistant.close_api_client()
+        assistant.scheduler.shutdown()
+        api.shutdown()
+        assistant.log_writer.stop()  # release assistant.log so the temporary directory can be removed
+
+    print(json.dumps(result, indent=2))
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROMPTS = [
+    "Hello, how are you today?",
+    "What do you like to do on weekends?",
+    "Can you recommend a good book?",
+    "What is the best way to learn a new language?",
+]
+
+def rss_mb():
+    """Peak resident memory of this process in MB (NaN on Windows without psutil)"""
+    if sys.platform == 'win32':
+        # Only Windows reports a peak through psutil; elsewhere memory_info().rss is the current value
+        try:
+            import psutil
+        except ImportError:
+            return float('nan')
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_variant(model_path, precision, new_tokens, threads):
+    """Load one variant and measure it; runs in its own process so memory numbers don't mix"""
+    import torch
+    from llm_engine import LLMEngine
+
+    engine = LLMEngine(model_path, precision=precision, num_threads=threads or None)
+    start = time.perf_counter()
+    if not engine.load():
+        return {'precision': precision, 'model_path': model_path, 'error': 'load failed'}
+    load_seconds = time.perf_counter() - start
+
+    generated = 0
+    start = time.perf_counter()
+    for prompt in PROMPTS:
+        inputs = engine.tokenizer.encode(prompt, return_tensors="pt")
+        with torch.no_grad():
+            outputs = engine.model.generate(inputs, max_new_tokens=new_tokens, min_new_tokens=new_tokens,
+                                            do_sample=False, pad_token_id=engine.tokenizer.eos_token_id)
+        generated += outputs.shape[1] - inputs.shape[1]
+    gen_seconds = time.perf_counter() - start
+
+    return {
+        'precision': precision,
+        'model_path': model_path,
+        'load_seconds': round(load_seconds, 3),
+        'tokens_per_second': round(generated / gen_seconds, 2),
+        'peak_rss_mb': round(rss_mb(), 1),
+        'threads': torch.get_num_threads(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare RSS, load time and tokens/sec of LLM precision variants")
+    parser.add_argument("--path", default="llm-model", help="fp32 model directory")
+    parser.add_argument("--variants", nargs="+", default=["fp32", "bf16", "int8"],
+                        help="precisions to test; converted copies in <path>-<precision> are used when present")
+    parser.add_argument("--tokens", type=int, default=32, help="new tokens generated per prompt")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads (0 = torch default)")
+    parser.add_argument("--worker", nargs=2, metavar=("PATH", "PRECISION"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_variant(args.worker[0], args.worker[1], args.tokens, args.threads)))
+        return
+
+    results = []
+    for precision in args.variants:
+        converted = f"{args.path}-{precision}"
+        model_path = converted if os.path.isdir(converted) else args.path
+        proc = subprocess.run([sys.executable, __file__, "--worker", model_path, precision,
+                               "--tokens", str(args.tokens), "--threads", str(args.threads)],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            results.append({'precision': precision, 'model_path': model_path, 'error': proc.stderr.strip()[-500:]})
+        else:
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print(f"{'precision':<10}{'model':<22}{'load s':>9}{'tok/s':>9}{'peak RSS MB':>14}")
+    for r in results:
+        if 'error' in r:
+            print(f"{r['precision']:<10}{r['model_path']:<22}  error: {r['error']}")
+        else:
+            print(f"{r['precision']:<10}{r['model_path']:<22}{r['load_seconds']:>9.2f}"
+                  f"{r['tokens_per_second']:>9.1f}{r['peak_rss_mb']:>14.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import re
+import time
+
+from intent_router import router
+
+# (utterance, expected intent); None means the command should fall through to the LLM
+CORPUS = [
+    ("current weather in new york", "weather"),
+    ("what's the weather in paris", "weather"),
+    ("weather for san francisco", "weather"),
+    ("weather", "weather_no_city"),
+    ("weather in", "weather_no_city"),
+    ("weather forecast in london", "forecast"),
+    ("give me the weather forecast for nairobi", "forecast"),
+    ("what is the forecast in paris", "forecast"),
+    ("forecast for london", "forecast"),
+    ("weather forecast", "forecast_no_city"),
+    ("what time is it", "time"),
+    ("tell me the time", "time"),
+    ("current time please", "time"),
+    ("sometimes i wonder about the stars", None),
+    ("this is a test", None),
+    ("tell me about history", None),
+    ("latest news", "news"),
+    ("read me the headlines", "news"),
+    ("set reminder buy milk in 5 minutes", "reminder"),
+    ("remind me to call mom in 10 minutes", "reminder"),
+    ("set a reminder", "reminder_incomplete"),
+    ("tell me a joke", "joke"),
+    ("send email to bob", "email"),
+    ("send mail", "email"),
+    ("open reddit", "open_reddit"),
+    ("open website google.com", "open_website"),
+    ("open notepad", "open_app"),
+    ("hi there", "greeting"),
+    ("hello ovo", "greeting"),
+    ("what's up", "greeting"),
+    ("which is better, cats or dogs", None),
+    ("quit", "exit"),
+    ("exit the assistant", "exit"),
+    ("please close the window", "exit"),
+    ("how close is the moon", None),
+    ("i want to quit smoking", None),
+    ("how do i make pancakes", None),
+    ("shipping costs are high", None),
+]
+
+def legacy_route(command):
+    """The substring chain match_command used before the compiled router, for comparison"""
+    command = command.lower()
+    if "weather" in command:
+        if re.search(r'weather(?: in)? ([a-zA-Z ]+)', command):
+            return "weather"
+        return "weather_no_city"
+    if any(kw in command for kw in ["time", "what time", "current time", "tell me the time"]):
+        return "time"
+    if any(kw in command for kw in ["news", "headlines"]):
+        return "news"
+    if any(kw in command for kw in ["remind", "reminder"]):
+        return "reminder" if re.search(r'set reminder (.*) in (\d+) minutes', command) else "reminder_incomplete"
+    if "joke" in command:
+        return "joke"
+    if "email" in command or "send mail" in command:
+        return "email"
+    if "open" in command:
+        if "reddit" in command:
+            return "open_reddit"
+        elif "website" in command:
+            return "open_website"
+        return "open_app"
+    if any(kw in command for kw in ["what's up", "hello", "hi", "hey"]):
+        return "greeting"
+    if any(kw in command for kw in ["exit", "quit", "close"]):
+        return "exit"
+    return None
+
+def measure(name, route, rounds):
+    correct = sum(route(text) == expected for text, expected in CORPUS)
+    misses = [(text, expected, route(text)) for text, expected in CORPUS if route(text) != expected]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text, _ in CORPUS:
+            route(text)
+    elapsed = time.perf_counter() - start
+    routed = rounds * len(CORPUS)
+    print(f"{name:<10} accuracy {correct}/{len(CORPUS)} ({correct / len(CORPUS) * 100:.0f}%)  "
+          f"{routed / elapsed:,.0f} routes/s  {elapsed / routed * 1e6:.2f} us/route")
+    for text, expected, got in misses:
+        print(f"    {text!r}: expected {expected}, got {got}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Routing throughput and accuracy of the intent router")
+    parser.add_argument("--rounds", type=int, default=2000, help="passes over the corpus")
+    args = parser.parse_args()
+    measure("trie", lambda text: router.route(text)[0], args.rounds)
+    measure("legacy", legacy_route, args.rounds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import time
+
+from audio_capture import CHUNK_SIZE, SAMPLE_RATE, Endpointer, SpeechPipeline, WakeWordGate
+from benchmark_e2e import FileCapture, load_clips
+from tracing import tracer
+
+
+def stage_count(stage):
+    return tracer.snapshot()['stages'].get(stage, {}).get('count', 0)
+
+
+def run_mode(args, clips, wake_gate):
+    """Play the clips through one pipeline and measure the CPU it burns per second of audio"""
+    capture = FileCapture(clips, SAMPLE_RATE, CHUNK_SIZE, speed=args.speed)
+    pipeline = SpeechPipeline(capture, Endpointer(threshold=args.threshold), mode='offline',
+                              vosk_model_path=args.vosk_model, wake_gate=wake_gate)
+    pipeline.load()  # model loading is not part of the steady-state cost
+    if wake_gate is not None and pipeline.wake_gate is None:
+        raise SystemExit(f"Wake phrase {wake_gate.phrase!r} is not in the vocabulary of {args.vosk_model}")
+    decoded_before = stage_count('decode')
+    transcripts = []
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    pipeline.start()
+    finished_at = None
+    while True:
+        command, _ = pipeline.get_utterance(0.1)
+        if command:
+            transcripts.append(command)
+        if capture.finished.is_set():
+            # Give the segmenter a moment to read the tail of the buffer before checking for idle
+            finished_at = finished_at or time.perf_counter()
+            if time.perf_counter() - finished_at > 0.5 and pipeline.idle and pipeline.utterances.empty():
+                break
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    pipeline.stop()
+    audio_seconds = sum(len(capture.gap) * 2 + len(clip) for clip in clips) / 2 / SAMPLE_RATE
+    result = {
+        'audio_s': round(audio_seconds, 1),
+        'wall_s': round(wall, 1),
+        'cpu_s': round(cpu, 2),
+        'cpu_per_audio_s_pct': round(100 * cpu / audio_seconds, 2),
+        'decoded': stage_count('decode') - decoded_before,
+        'transcripts': transcripts,
+    }
+    if wake_gate is not None:
+        result.update(wake_checked=wake_gate.checked, wake_detected=wake_gate.detected)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU cost of always-on recognition versus wake-word gated recognition")
+    parser.add_argument("--vosk-model", default=os.getenv('VOSK_MODEL_PATH', 'vosk-model-small-en-us-0.15'))
+    parser.add_argument("--audio", help="directory of 16 kHz mono WAV clips (default: synthetic noise bursts)")
+    parser.add_argument("--speed", type=float, default=4.0, help="playback speed relative to real time")
+    parser.add_argument("--threshold", type=int, default=500, help="VAD energy threshold")
+    parser.add_argument("--wake-word", default=os.getenv('WAKE_WORD') or "computer",
+                        help="wake phrase; every word must be in the Vosk model's vocabulary")
+    parser.add_argument("--sensitivity", type=float, default=0.5)
+    parser.add_argument("--window-ms", type=int, default=8000)
+    args = parser.parse_args()
+    if not os.path.exists(args.vosk_model):
+        raise SystemExit(f"Vosk model not found at {args.vosk_model}")
+
+    clips = load_clips(args.audio, SAMPLE_RATE)
+    always_on = run_mode(args, clips, None)
+    gated = run_mode(args, clips, WakeWordGate(args.wake_word, sensitivity=args.sensitivity,
+                                               window_ms=args.window_ms))
+    saved = 1 - gated['cpu_s'] / always_on['cpu_s'] if always_on['cpu_s'] else 0.0
+    print(json.dumps({
+        'always_on': always_on,
+        'gated': gated,
+        'cpu_saved_pct': round(100 * saved, 1),
+        'settings': {'wake_word': args.wake_word, 'sensitivity': args.sensitivity, 'window_ms': args.window_ms,
+                     'speed': args.speed, 'clips': len(clips)},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
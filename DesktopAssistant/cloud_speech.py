@@ -0,0 +1,64 @@
+import logging
+import threading
+
+from lazy_loader import lazy_import
+
+grpc = lazy_import('grpc')
+speech = lazy_import('google.cloud.speech')
+
+
+class CloudRecognizer:
+    """Google streaming recognizer that keeps one SpeechClient (and its gRPC channel) for the whole session"""
+    def __init__(self, rate=16000, language_code="en-US", client=None):
+        self.rate = rate
+        self.language_code = language_code
+        self._client = client
+        self._streaming_config = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = speech.SpeechClient()
+                logging.info("Cloud speech client created")
+            return self._client
+
+    @property
+    def streaming_config(self):
+        if self._streaming_config is None:
+            self._streaming_config = speech.StreamingRecognitionConfig(
+                config=speech.RecognitionConfig(
+                    encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+                    sample_rate_hertz=self.rate,
+                    language_code=self.language_code,
+                ),
+                interim_results=False,
+                single_utterance=False,
+            )
+        return self._streaming_config
+
+    def warm_up(self, timeout=5):
+        """Create the client and open its channel before the first utterance arrives"""
+        try:
+            channel = self.client.transport.grpc_channel
+            grpc.channel_ready_future(channel).result(timeout=timeout)
+            logging.info("Cloud speech channel ready")
+        except Exception as e:
+            logging.warning(f"Cloud speech warm-up failed: {e}")
+
+    def recognize(self, chunks):
+        """Stream audio chunks to Google as they are produced; returns the transcript and its mean confidence"""
+        requests_iter = (speech.StreamingRecognizeRequest(audio_content=chunk) for chunk in chunks)
+        responses = self.client.streaming_recognize(config=self.streaming_config, requests=requests_iter)
+        parts = []
+        confidences = []
+        for response in responses:
+            for result in response.results:
+                if result.is_final and result.alternatives:
+                    parts.append(result.alternatives[0].transcript.strip())
+                    confidences.append(result.alternatives[0].confidence)
+        command = ' '.join(parts).lower().strip()
+        confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        logging.info(f"Recognized (cloud): {command}")
+        return command, confidence
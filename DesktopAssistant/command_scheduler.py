@@ -0,0 +1,185 @@
+import asyncio
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, CancelledError
+
+
+class SchedulerBusy(Exception):
+    """Raised when a lane's queue is full; callers should tell the user to retry"""
+
+
+class Job:
+    """A submitted command: its future, a cooperative cancel flag and timing"""
+    _ids = itertools.count(1)
+
+    def __init__(self, func, args, lane, timeout, name):
+        self.id = next(Job._ids)
+        self.func = func
+        self.args = args
+        self.lane = lane
+        self.timeout = timeout
+        self.name = name or getattr(func, '__name__', 'job')
+        self.is_async = asyncio.iscoroutinefunction(func)
+        self.future = Future()
+        self.cancel_event = threading.Event()
+        self.submitted_at = time.perf_counter()
+        self._task = None
+        self._loop = None
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """Skip the job if it has not started; a running job sees cancel_event (async jobs are cancelled outright)"""
+        self.cancel_event.set()
+        self.future.cancel()
+        if self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+    def _finish(self, result=None, error=None):
+        if self.future.done():
+            return
+        if error is not None:
+            self.future.set_exception(error)
+        else:
+            self.future.set_result(result)
+
+
+class CommandScheduler:
+    """Bounded worker lanes for command handlers plus an asyncio loop for native-async handlers.
+
+    The 'general' lane has a small pool of workers; the 'llm' lane has a single worker by default so
+    model jobs never compete for torch threads. More llm workers only make sense when their jobs
+    share one model through a batching queue. Each lane has a bounded queue and submit() raises SchedulerBusy
+    instead of growing without limit.
+    """
+    def __init__(self, workers=4, queue_size=16, llm_queue_size=4, timeout=30, llm_timeout=120, llm_workers=1):
+        self.workers = workers
+        self.llm_workers = llm_workers
+        self.timeouts = {'general': timeout, 'llm': llm_timeout}
+        self._queues = {'general': queue.Queue(maxsize=queue_size), 'llm': queue.Queue(maxsize=llm_queue_size)}
+        self._threads = []
+        for lane, count in (('general', workers), ('llm', llm_workers)):
+            for i in range(count):
+                thread = threading.Thread(target=self._worker, args=(lane,), name=f"{lane}-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        self._jobs = {}
+        self._jobs_lock = threading.Lock()
+        self._async_limit = workers + queue_size
+        self._async_pending = 0
+        self.loop = asyncio.new_event_loop()
+        self._async_slots = None
+        self._loop_thread = threading.Thread(target=self._run_loop, name="asyncio-loop", daemon=True)
+        self._loop_thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self._async_slots = asyncio.Semaphore(self.workers)
+        self.loop.run_forever()
+
+    def submit(self, func, *args, lane='general', timeout=None, name=None):
+        """Queue func(*args) on a lane; coroutine functions run on the scheduler's asyncio loop"""
+        job = Job(func, args, lane, timeout or self.timeouts[lane], name)
+        with self._jobs_lock:
+            if job.is_async:
+                if self._async_pending >= self._async_limit:
+                    raise SchedulerBusy("Too many pending async jobs")
+                self._async_pending += 1
+            self._jobs[job.id] = job
+        job.future.add_done_callback(lambda _: self._forget(job))
+        if job.is_async:
+            job._loop = self.loop
+            asyncio.run_coroutine_threadsafe(self._run_async(job), self.loop)
+        else:
+            try:
+                self._queues[lane].put_nowait(job)
+            except queue.Full:
+                self._forget(job)
+                raise SchedulerBusy(f"The {lane} lane is full")
+        return job
+
+    def run_coroutine(self, coro):
+        """Run a coroutine on the scheduler loop from another thread; returns a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def cancel_all(self, lane=None):
+        with self._jobs_lock:
+            jobs = [job for job in self._jobs.values() if lane is None or job.lane == lane]
+        for job in jobs:
+            job.cancel()
+        return len(jobs)
+
+    def pending(self, lane=None):
+        with self._jobs_lock:
+            return len([job for job in self._jobs.values() if lane is None or job.lane == lane])
+
+    def _forget(self, job):
+        with self._jobs_lock:
+            if self._jobs.pop(job.id, None) is not None and job.is_async:
+                self._async_pending -= 1
+
+    def _worker(self, lane):
+        while True:
+            job = self._queues[lane].get()
+            if job is None:
+                break
+            if job.cancelled or not job.future.set_running_or_notify_cancel():
+                logging.info(f"Job {job.id} ({job.name}) cancelled before it started")
+                continue
+            waited = time.perf_counter() - job.submitted_at
+            timer = threading.Timer(job.timeout, self._expire, args=(job,))
+            timer.daemon = True
+            timer.start()
+            try:
+                job._finish(result=job.func(*job.args))
+            except Exception as e:
+                job._finish(error=e)
+            except BaseException as e:
+                # SystemExit and friends: one job must never take a pool thread (or its caller) down with it
+                logging.error(f"Job {job.id} ({job.name}) raised {e!r}")
+                job._finish(error=RuntimeError(f"{job.name} raised {e!r}"))
+            finally:
+                timer.cancel()
+            logging.info(f"Job {job.id} ({job.name}) on {lane} lane: waited {waited * 1000:.0f} ms, "
+                         f"ran {(time.perf_counter() - job.submitted_at - waited) * 1000:.0f} ms")
+
+    def _expire(self, job):
+        """A thread cannot be killed, so a timed-out job is failed and asked to stop via its cancel flag"""
+        if job.future.done():
+            return
+        job.cancel_event.set()
+        job._finish(error=TimeoutError(f"{job.name} timed out after {job.timeout} s"))
+        logging.warning(f"Job {job.id} ({job.name}) timed out after {job.timeout} s")
+
+    async def _run_async(self, job):
+        if job.cancelled or not job.future.set_running_or_notify_cancel():
+            return
+        job._task = asyncio.current_task()
+        start = time.perf_counter()
+        try:
+            async with self._async_slots:
+                result = await asyncio.wait_for(job.func(*job.args), job.timeout)
+            job._finish(result=result)
+        except asyncio.TimeoutError:
+            job._finish(error=TimeoutError(f"{job.name} timed out after {job.timeout} s"))
+            logging.warning(f"Job {job.id} ({job.name}) timed out after {job.timeout} s")
+        except asyncio.CancelledError:
+            job._finish(error=CancelledError())
+        except Exception as e:
+            job._finish(error=e)
+        logging.info(f"Async job {job.id} ({job.name}) ran {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def shutdown(self):
+        self.cancel_all()
+        for lane, count in (('general', self.workers), ('llm', self.llm_workers)):
+            for _ in range(count):
+                try:
+                    self._queues[lane].put_nowait(None)
+                except queue.Full:
+                    pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
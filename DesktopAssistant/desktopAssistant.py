@@ -1,4 +1,5 @@
-import re
+import time
+_process_start = time.perf_counter()
 import webbrowser
 import smtplib
 import subprocess
@@ -9,22 +10,30 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 import os
-import requests
-import json
-from vosk import Model, KaldiRecognizer
-import pyaudio
-from google.cloud import speech
-import io
+import argparse
+import contextvars
+from cloud_speech import CloudRecognizer
+from audio_capture import CaptureEngine, Endpointer, SpeechPipeline, WakeWordGate
 import threading
 import customtkinter as ctk
 from tkinter import messagebox
 import pystray
 from PIL import Image, ImageDraw
-import difflib
 import queue
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import torch
 import sys
+from lazy_loader import WarmUp
+from llm_engine import BatchQueue, ConversationSession, LLMEngine, SentenceSplitter
+from response_cache import ResponseCache
+from intent_router import router
+from http_client import HttpClient
+from command_scheduler import CommandScheduler, SchedulerBusy
+from reminder_scheduler import ReminderScheduler
+from tts_cache import TTSCache
+from assistant_server import AssistantServer
+from tracing import tracer, current_trace, set_trace, reset_trace
+from memory_governor import MemoryGovernor, format_mb, rss_mb
+from log_writer import install_queue_handler, start_writer
+from ui_bus import ChatView, UiBus
 
 # Patch: Add vosk DLL directory to PATH for PyInstaller bundle
 if hasattr(sys, '_MEIPASS'):
@@ -40,7 +49,8 @@ else:
 os.makedirs(log_dir, exist_ok=True)
 log_file = os.path.join(log_dir, 'assistant.log')
 
-logging.basicConfig(filename=log_file, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Records are queued immediately and written by a background thread once the settings are loaded
+_log_queue = install_queue_handler(logging.INFO)
 
 # Check for first run and setup if needed
 if not os.path.exists('.env'):
@@ -51,286 +61,641 @@ if not os.path.exists('.env'):
         logging.error(f"First run setup failed: {e}")
 
 load_dotenv()
+LOG_MAX_MB = float(os.getenv('LOG_MAX_MB', '5'))
+LOG_BACKUPS = int(os.getenv('LOG_BACKUPS', '3'))
+log_writer = start_writer(_log_queue, log_file, max_bytes=int(LOG_MAX_MB * 1024 * 1024), backups=LOG_BACKUPS)
+CHAT_MAX_LINES = int(os.getenv('CHAT_MAX_LINES', '500'))
 EMAIL_USER = os.getenv('EMAIL_USER')
 EMAIL_PASS = os.getenv('EMAIL_PASS')
 WEATHER_API_KEY = os.getenv('WEATHER_API_KEY')
 NEWS_API_KEY = os.getenv('NEWS_API_KEY')
 LLM_MODEL_PATH = os.getenv('LLM_MODEL_PATH', 'llm-model')
+WARMUP_ON_START = os.getenv('WARMUP_ON_START', 'true').lower() in ('1', 'true', 'yes')
 
-# Initialize LLM
-try:
-    tokenizer = AutoTokenizer.from_pretrained(LLM_MODEL_PATH)
-    model = AutoModelForCausalLM.from_pretrained(LLM_MODEL_PATH)
-    if tokenizer.pad_token is None:
-        tokenizer.pad_token = tokenizer.eos_token
-    logging.info(f"Transformers model loaded: {LLM_MODEL_PATH}")
-except Exception as e:
-    tokenizer = None
-    model = None
-    logging.error(f"Failed to load transformers model: {e}")
+# LLM is loaded on first use or by the warm-up thread
+LLM_STREAMING = os.getenv('LLM_STREAMING', 'true').lower() in ('1', 'true', 'yes')
+# Weight precision (fp32, bf16 or int8) and torch CPU threads; 0 keeps torch's default
+LLM_PRECISION = os.getenv('LLM_PRECISION', 'fp32').lower()
+LLM_THREADS = int(os.getenv('LLM_THREADS', '0'))
+llm = LLMEngine(LLM_MODEL_PATH, precision=LLM_PRECISION, num_threads=LLM_THREADS)
+# Token budget for the conversation history kept (with its KV cache) between turns
+LLM_CONTEXT_TOKENS = int(os.getenv('LLM_CONTEXT_TOKENS', '512'))
+conversation = ConversationSession(max_tokens=LLM_CONTEXT_TOKENS)
+_conversation_turn = threading.Lock()  # desktop turns share llm_interrupt and the conversation, so one at a time
+# Concurrent LLM prompts from API clients are padded into one batched generate(); 1 answers them one by one
+LLM_BATCH_SIZE = int(os.getenv('LLM_BATCH_SIZE', '1'))
+LLM_BATCH_WINDOW_MS = float(os.getenv('LLM_BATCH_WINDOW_MS', '20'))
+
+def _record_batch(size, tokens, seconds):
+    tracer.record('llm_batch', seconds * 1000)
+    tracer.set_value('llm_batch_size', size)
+    tracer.set_value('llm_batch_size_mean', llm_batcher.requests / llm_batcher.batches)
+    tracer.set_value('llm_tokens_per_s', tokens / max(seconds, 1e-6))
+
+llm_batcher = None
+if LLM_BATCH_SIZE > 1:
+    llm_batcher = BatchQueue(llm, max_batch=LLM_BATCH_SIZE, window_ms=LLM_BATCH_WINDOW_MS, on_batch=_record_batch)
+
+# Cache of LLM answers keyed on normalized prompt text; size 0 disables it
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '256'))
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '86400'))
+RESPONSE_CACHE_FUZZY = float(os.getenv('RESPONSE_CACHE_FUZZY', '0'))
+RESPONSE_CACHE_PERSIST = os.getenv('RESPONSE_CACHE_PERSIST', 'true').lower() in ('1', 'true', 'yes')
+response_cache = None
+if RESPONSE_CACHE_SIZE > 0:
+    response_cache = ResponseCache(
+        max_entries=RESPONSE_CACHE_SIZE,
+        ttl=RESPONSE_CACHE_TTL,
+        fuzzy_cutoff=RESPONSE_CACHE_FUZZY,
+        path=os.path.join(log_dir, 'response_cache.json') if RESPONSE_CACHE_PERSIST else None,
+    )
 
 # Initialize TTS
 engine = pyttsx3.init()
 engine.setProperty('rate', 150)
 engine.setProperty('volume', 0.9)
+
+# Fixed phrases are rendered to WAV once and then played from disk instead of re-synthesized
+COMMON_PHRASES = [
+    "Ovo is ready for your command",
+    "Yes?",
+    "Please specify a city for the weather.",
+    "Please specify a city for the forecast.",
+    "Please specify a reminder and time in minutes.",
+    "Please provide a question or message.",
+    "Here's a joke: Why did the chicken join a band? Because it had the drumsticks!",
+    "Email functionality is not available in this demo.",
+    "Opening Reddit...",
+    "Opening website...",
+    "Opening app...",
+    "Just chilling, ready to assist!",
+    "Goodbye!",
+    "Sorry, I couldn't fetch the news.",
+    "Error fetching news.",
+    "Sorry, there was an error with the AI model.",
+    "I'm not sure how to respond to that.",
+    "Cloud recognition failed.",
+    "Error with offline recognition. Trying cloud...",
+]
+_common_phrases = set(COMMON_PHRASES)
+TTS_CACHE_MB = int(os.getenv('TTS_CACHE_MB', '50'))
+tts_cache = None
+if TTS_CACHE_MB > 0:
+    tts_cache = TTSCache(os.path.join(log_dir, 'tts_cache'), max_bytes=TTS_CACHE_MB * 1024 * 1024,
+                         rate=engine.getProperty('rate'), volume=engine.getProperty('volume'),
+                         voice=engine.getProperty('voice'))
+
 _tts_queue = queue.Queue()
+# Barge-in bumps the epoch; queued speech from an older epoch is dropped instead of played
+_tts_epoch = 0
+_tts_speaking = threading.Event()
+_tts_stop = threading.Event()
+_barge_in_at = None
+def _tts_say(text):
+    path = None
+    if tts_cache is not None and text in _common_phrases:
+        path = tts_cache.get(text) or tts_cache.render(engine, text)
+    if path is not None:
+        try:
+            tts_cache.play(path, stop_event=_tts_stop)
+            return
+        except Exception as e:
+            logging.warning(f"Cached speech playback failed: {e}")
+    engine.say(text)
+    engine.runAndWait()
+
 def _tts_worker():
+    global _barge_in_at
     while True:
-        text = _tts_queue.get()
-        if text is None:
+        item = _tts_queue.get()
+        if item is None:
             break
-        engine.say(text)
-        engine.runAndWait()
+        text, on_start, epoch, trace = item
+        if epoch is None:
+            # Pre-render request from warm-up; on_start signals completion
+            if tts_cache is not None and not tts_cache.contains(text):
+                tts_cache.render(engine, text)
+            if on_start is not None:
+                on_start()
+        elif epoch == _tts_epoch:
+            trace_id, queued_at = trace
+            start = time.perf_counter()
+            tracer.record('tts_wait', (start - queued_at) * 1000, trace_id)
+            if on_start is not None:
+                on_start()
+            _tts_stop.clear()
+            _tts_speaking.set()
+            _tts_say(text)
+            _tts_speaking.clear()
+            tracer.record('tts', (time.perf_counter() - start) * 1000, trace_id)
+            if _barge_in_at is not None:
+                logging.info(f"Barge-in to silence: {(time.perf_counter() - _barge_in_at) * 1000:.0f} ms")
+                _barge_in_at = None
         _tts_queue.task_done()
 _tts_thread = threading.Thread(target=_tts_worker, daemon=True)
 _tts_thread.start()
-def speak(text):
+# (replies, speak_aloud) while a command runs for an API client: spoken text is collected as its reply
+_reply = contextvars.ContextVar('reply', default=None)
+
+def speak(text, on_start=None):
+    """Queue text for the TTS thread; on_start is called just before it is spoken"""
+    collector = _reply.get()
+    if collector is not None:
+        collector[0].append(text)
+        if not collector[1]:
+            return
     logging.info(f"Speaking: {text}")
-    _tts_queue.put(text)
+    _tts_queue.put((text, on_start, _tts_epoch, (current_trace(), time.perf_counter())))
 
-reminders = {}
+def prerender_phrases(timeout=60):
+    """Warm-up step: render COMMON_PHRASES missing from the TTS cache on the TTS thread and wait for them"""
+    if tts_cache is None:
+        return
+    missing = [text for text in COMMON_PHRASES if not tts_cache.contains(text)]
+    done = threading.Event()
+    for i, text in enumerate(missing):
+        _tts_queue.put((text, done.set if i == len(missing) - 1 else None, None, None))
+    if missing and not done.wait(timeout):
+        logging.warning("TTS pre-rendering did not finish in time")
+    logging.info(f"TTS cache ready: {len(missing)} phrases rendered ({tts_cache.stats()})")
 
-# Voice recognition (offline/online)
-async def listen():
-    RECOGNITION_MODE = os.getenv('RECOGNITION_MODE', 'offline')
-    VOSK_MODEL_PATH = os.getenv('VOSK_MODEL_PATH', 'vosk-model-small-en-us-0.15')
-    if RECOGNITION_MODE == 'offline':
+# Set by barge-in; a running generate() stops at its next token
+llm_interrupt = threading.Event()
+llm_generating = threading.Event()
+# Off by default: the energy VAD has no echo gating, so on speakers the assistant would interrupt itself
+BARGE_IN_ON_SPEECH = os.getenv('BARGE_IN_ON_SPEECH', 'false').lower() in ('1', 'true', 'yes')
+
+def barge_in(reason):
+    """Silence current speech, drop queued speech and stop LLM generation because the user spoke or typed"""
+    global _tts_epoch, _barge_in_at
+    if not (_tts_speaking.is_set() or not _tts_queue.empty() or llm_generating.is_set()):
+        return
+    _tts_epoch += 1
+    llm_interrupt.set()
+    dropped = 0
+    keep = []
+    while True:
         try:
-            if not Path(VOSK_MODEL_PATH).exists():
-                speak(f"Vosk model not found at {VOSK_MODEL_PATH}. Please download and extract the model.")
-                logging.error(f"Vosk model not found at {VOSK_MODEL_PATH}")
-                exit(1)
-            vosk_model = Model(VOSK_MODEL_PATH)
-            p = pyaudio.PyAudio()
-            stream = p.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=8000)
-            stream.start_stream()
-            rec = KaldiRecognizer(vosk_model, 16000)
-            audio_data = b''
-            max_seconds = 5
-            chunk_size = 4000
-            num_chunks = int(16000 / chunk_size * max_seconds)
-            for _ in range(num_chunks):
-                data = stream.read(chunk_size, exception_on_overflow=False)
-                audio_data += data
-                if rec.AcceptWaveform(data):
-                    break
-            result = json.loads(rec.FinalResult())
-            command = result.get('text', '').lower()
-            logging.info(f"Recognized (offline): {command}")
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
-            if command:
-                return command
-            else:
-                speak("Sorry, I couldn't understand that (offline mode). Trying cloud...")
-                logging.warning("Vosk did not recognize speech, falling back to cloud.")
-                return await listen_cloud()
-        except Exception as e:
-            speak("Error with offline recognition. Trying cloud...")
-            logging.error(f"Vosk error: {e}")
-            return await listen_cloud()
+            item = _tts_queue.get_nowait()
+        except queue.Empty:
+            break
+        _tts_queue.task_done()
+        if item is None or item[2] is None:
+            keep.append(item)
+        else:
+            dropped += 1
+    for item in keep:
+        _tts_queue.put(item)
+    if _tts_speaking.is_set():
+        _barge_in_at = time.perf_counter()
+        _tts_stop.set()
+        engine.stop()
+    logging.info(f"Barge-in ({reason}): dropped {dropped} queued sentences")
+
+def announce_reminder(text, due, late):
+    if late > 60:
+        speak(f"Missed reminder from {datetime.fromtimestamp(due).strftime('%H:%M')}: {text}")
     else:
-        return await listen_cloud()
+        speak(f"Reminder: {text}")
 
-async def listen_cloud():
-    try:
-        speak("Listening (cloud mode)...")
-        p = pyaudio.PyAudio()
-        stream = p.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=8000)
-        stream.start_stream()
-        frames = []
-        seconds = 5
-        for _ in range(0, int(16000 / 8000 * seconds)):
-            data = stream.read(8000, exception_on_overflow=False)
-            frames.append(data)
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
-        audio_data = b''.join(frames)
-        client = speech.SpeechClient()
-        audio = speech.RecognitionAudio(content=audio_data)
-        config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-            sample_rate_hertz=16000,
-            language_code="en-US",
-        )
-        response = client.recognize(config=config, audio=audio)
-        command = ''
-        for result in response.results:
-            command += result.alternatives[0].transcript.lower() + ' '
-        command = command.strip()
-        logging.info(f"Recognized (cloud): {command}")
-        if command:
-            return command
-        else:
-            speak("Sorry, I couldn't understand that (cloud mode) either.")
-            logging.warning("Cloud recognition did not recognize speech.")
-            return ""
-    except Exception as e:
-        speak("Cloud recognition failed.")
-        logging.error(f"Cloud recognition error: {e}")
-        return ""
+# Pending reminders live in SQLite so they survive restarts; the timer runs on the scheduler's loop
+reminders = ReminderScheduler(os.path.join(log_dir, 'reminders.db'), on_due=announce_reminder)
+
+# Voice recognition (offline/online)
+RECOGNITION_MODE = os.getenv('RECOGNITION_MODE', 'offline')
+VOSK_MODEL_PATH = os.getenv('VOSK_MODEL_PATH', 'vosk-model-small-en-us-0.15')
+# Hybrid mode: minimum confidence for the first recognizer to finish to win the race
+HYBRID_MIN_CONFIDENCE = float(os.getenv('HYBRID_MIN_CONFIDENCE', '0.6'))
+# Endpointing: RMS level that counts as speech, and how long speech/silence must last
+VAD_ENERGY_THRESHOLD = int(os.getenv('VAD_ENERGY_THRESHOLD', '500'))
+VAD_SILENCE_MS = int(os.getenv('VAD_SILENCE_MS', '700'))
+VAD_MIN_SPEECH_MS = int(os.getenv('VAD_MIN_SPEECH_MS', '200'))
+VAD_PREROLL_MS = int(os.getenv('VAD_PREROLL_MS', '300'))
+VAD_MAX_UTTERANCE_MS = int(os.getenv('VAD_MAX_UTTERANCE_MS', '15000'))
+# Wake word: only utterances starting with it (or within the follow-up window) are fully recognized; empty disables
+WAKE_WORD = os.getenv('WAKE_WORD', '').strip().lower()
+WAKE_SENSITIVITY = float(os.getenv('WAKE_SENSITIVITY', '0.5'))
+WAKE_WINDOW_MS = int(os.getenv('WAKE_WINDOW_MS', '8000'))
+
+_speech_pipeline = None
+def get_speech_pipeline():
+    """Create the shared capture engine and recognizer pipeline on first use"""
+    global _speech_pipeline
+    if _speech_pipeline is None:
+        mode = RECOGNITION_MODE
+        if mode in ('offline', 'hybrid') and not Path(VOSK_MODEL_PATH).exists():
+            speak(f"Vosk model not found at {VOSK_MODEL_PATH}. Please download and extract the model.")
+            logging.error(f"Vosk model not found at {VOSK_MODEL_PATH}")
+            mode = 'cloud'
+        wake_gate = None
+        if WAKE_WORD:
+            if Path(VOSK_MODEL_PATH).exists():
+                wake_gate = WakeWordGate(WAKE_WORD, sensitivity=WAKE_SENSITIVITY, window_ms=WAKE_WINDOW_MS)
+            else:
+                logging.error(f"Wake word disabled: it needs the Vosk model at {VOSK_MODEL_PATH}")
+        endpointer = Endpointer(threshold=VAD_ENERGY_THRESHOLD, silence_ms=VAD_SILENCE_MS,
+                                min_speech_ms=VAD_MIN_SPEECH_MS, preroll_ms=VAD_PREROLL_MS,
+                                max_utterance_ms=VAD_MAX_UTTERANCE_MS)
+        _speech_pipeline = SpeechPipeline(CaptureEngine(), endpointer, mode=mode, vosk_model_path=VOSK_MODEL_PATH,
+                                          cloud=CloudRecognizer(), notify=speak, min_confidence=HYBRID_MIN_CONFIDENCE,
+                                          on_speech_start=(lambda: barge_in("speech")) if BARGE_IN_ON_SPEECH else None,
+                                          wake_gate=wake_gate, on_wake=lambda: speak("Yes?"))
+    return _speech_pipeline
+
+# Heavy models idle for longer than these are unloaded and reloaded on next use; 0 keeps them resident
+LLM_IDLE_UNLOAD_MINUTES = float(os.getenv('LLM_IDLE_UNLOAD_MINUTES', '0'))
+VOSK_IDLE_UNLOAD_MINUTES = float(os.getenv('VOSK_IDLE_UNLOAD_MINUTES', '0'))
+MEMORY_REPORT_MINUTES = float(os.getenv('MEMORY_REPORT_MINUTES', '5'))
+
+def _unload_llm():
+    conversation.drop_cache()
+    return llm.unload()
+
+governor = MemoryGovernor(report_interval=MEMORY_REPORT_MINUTES * 60)
+governor.register('llm', LLM_IDLE_UNLOAD_MINUTES * 60, is_loaded=lambda: llm.model is not None, unload=_unload_llm)
+governor.register('vosk', VOSK_IDLE_UNLOAD_MINUTES * 60,
+                  is_loaded=lambda: _speech_pipeline is not None and _speech_pipeline.loaded,
+                  unload=lambda: _speech_pipeline.unload(),
+                  is_busy=lambda: _speech_pipeline is not None and _speech_pipeline.running)
+governor.start()
 
 # Utility and command functions
 
+# Weather and news lookups share one pooled HTTP session; responses are cached per endpoint
+# Base URLs can be pointed at a proxy or a local fake server (see benchmark_e2e.py)
+WEATHER_API_BASE = os.getenv('WEATHER_API_BASE', 'http://api.weatherapi.com/v1')
+NEWS_API_BASE = os.getenv('NEWS_API_BASE', 'https://newsapi.org/v2')
+WEATHER_CURRENT_URL = f"{WEATHER_API_BASE}/current.json"
+WEATHER_FORECAST_URL = f"{WEATHER_API_BASE}/forecast.json"
+NEWS_URL = f"{NEWS_API_BASE}/top-headlines"
+WEATHER_CACHE_TTL = int(os.getenv('WEATHER_CACHE_TTL', '600'))
+FORECAST_CACHE_TTL = int(os.getenv('FORECAST_CACHE_TTL', '3600'))
+NEWS_CACHE_TTL = int(os.getenv('NEWS_CACHE_TTL', '3600'))
+WEATHER_TIMEOUT = (3.05, 5)
+NEWS_TIMEOUT = (3.05, 8)
+api_client = HttpClient()
+
 def tell_time():
     now = datetime.now()
     current_time = now.strftime('%I:%M %p')
     speak(f"The current time is {current_time}.")
     logging.info(f"Told time: {current_time}")
 
-def get_weather(command):
-    match = re.search(r'current weather in (.*)', command)
-    if match:
-        city = match.group(1)
+# Each lookup has a request builder and a reporter shared by the blocking and async handlers
+def weather_request(city):
+    return WEATHER_CURRENT_URL, dict(params={'key': WEATHER_API_KEY, 'q': city, 'aqi': 'no'},
+                                     ttl=WEATHER_CACHE_TTL, timeout=WEATHER_TIMEOUT)
+
+def report_weather(city, status_code, data):
+    if status_code == 200:
+        temp = data['current']['temp_c']
+        status = data['current']['condition']['text']
+        city_name = data['location']['name']
+        speak(f"The current weather in {city_name} is {status} with a temperature of {temp:.1f} degrees Celsius.")
+        logging.info(f"Weather for {city_name}: {status}, {temp}°C")
+    else:
+        speak(f"Sorry, I couldn't fetch the weather for {city}.")
+        logging.warning(f"Weather API error: {status_code}")
+
+async def get_weather_async(city=None):
+    if city:
+        city = city.strip()
         try:
-            url = f"http://api.weatherapi.com/v1/current.json?key={WEATHER_API_KEY}&q={city}&aqi=no"
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                temp = data['current']['temp_c']
-                status = data['current']['condition']['text']
-                city_name = data['location']['name']
-                speak(f"The current weather in {city_name} is {status} with a temperature of {temp:.1f} degrees Celsius.")
-                logging.info(f"Weather for {city_name}: {status}, {temp}°C")
-            else:
-                speak(f"Sorry, I couldn't fetch the weather for {city}.")
-                logging.warning(f"Weather API error: {response.status_code}")
+            url, options = weather_request(city)
+            report_weather(city, *await api_client.get_json_async(url, **options))
         except Exception as e:
             speak(f"Sorry, I couldn't fetch the weather for {city}.")
             logging.error(f"Weather fetch error: {e}")
     else:
         speak("Please specify a city for the weather.")
 
-def get_forecast(command):
-    match = re.search(r'weather forecast in (.*)', command)
-    if match:
-        city = match.group(1)
+def forecast_request(city):
+    return WEATHER_FORECAST_URL, dict(params={'key': WEATHER_API_KEY, 'q': city, 'days': 3, 'aqi': 'no', 'alerts': 'no'},
+                                      ttl=FORECAST_CACHE_TTL, timeout=WEATHER_TIMEOUT)
+
+def report_forecast(city, status_code, data):
+    if status_code == 200:
+        city_name = data['location']['name']
+        for day in data['forecast']['forecastday'][:3]:
+            date = day['date']
+            temp_max = day['day']['maxtemp_c']
+            temp_min = day['day']['mintemp_c']
+            status = day['day']['condition']['text']
+            speak(f"On {date}, {city_name} will have {status}. The high will be {temp_max:.1f} degrees Celsius, and the low will be {temp_min:.1f} degrees Celsius.")
+            logging.info(f"Forecast for {city_name} on {date}: {status}, {temp_max}°C/{temp_min}°C")
+    else:
+        speak(f"Sorry, I couldn't fetch the forecast for {city}.")
+        logging.warning(f"Forecast API error: {status_code}")
+
+async def get_forecast_async(city=None):
+    if city:
+        city = city.strip()
         try:
-            url = f"http://api.weatherapi.com/v1/forecast.json?key={WEATHER_API_KEY}&q={city}&days=3&aqi=no&alerts=no"
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                city_name = data['location']['name']
-                for day in data['forecast']['forecastday'][:3]:
-                    date = day['date']
-                    temp_max = day['day']['maxtemp_c']
-                    temp_min = day['day']['mintemp_c']
-                    status = day['day']['condition']['text']
-                    speak(f"On {date}, {city_name} will have {status}. The high will be {temp_max:.1f} degrees Celsius, and the low will be {temp_min:.1f} degrees Celsius.")
-                    logging.info(f"Forecast for {city_name} on {date}: {status}, {temp_max}°C/{temp_min}°C")
-            else:
-                speak(f"Sorry, I couldn't fetch the forecast for {city}.")
-                logging.warning(f"Forecast API error: {response.status_code}")
+            url, options = forecast_request(city)
+            report_forecast(city, *await api_client.get_json_async(url, **options))
         except Exception as e:
             speak(f"Sorry, I couldn't fetch the forecast for {city}.")
             logging.error(f"Forecast fetch error: {e}")
     else:
         speak("Please specify a city for the forecast.")
 
-def get_news():
+def news_request():
+    return NEWS_URL, dict(params={'country': 'us', 'apiKey': NEWS_API_KEY}, ttl=NEWS_CACHE_TTL, timeout=NEWS_TIMEOUT)
+
+def report_news(status_code, data):
+    if status_code == 200:
+        articles = data['articles'][:3]
+        for i, article in enumerate(articles, 1):
+            speak(f"News {i}: {article['title']}")
+            logging.info(f"News: {article['title']}")
+    else:
+        speak("Sorry, I couldn't fetch the news.")
+        logging.warning(f"Failed to fetch news: {status_code}")
+
+async def get_news_async():
     try:
-        url = f"https://newsapi.org/v2/top-headlines?country=us&apiKey={NEWS_API_KEY}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            articles = response.json()['articles'][:3]
-            for i, article in enumerate(articles, 1):
-                speak(f"News {i}: {article['title']}")
-                logging.info(f"News: {article['title']}")
-        else:
-            speak("Sorry, I couldn't fetch the news.")
-            logging.warning("Failed to fetch news")
+        url, options = news_request()
+        report_news(*await api_client.get_json_async(url, **options))
     except Exception as e:
         speak("Error fetching news.")
         logging.error(f"News fetch error: {e}")
 
-def set_reminder(command):
-    match = re.search(r'set reminder (.*) in (\d+) minutes', command)
-    if match:
-        reminder_text = match.group(1)
-        minutes = int(match.group(2))
+def set_reminder(text=None, minutes=None):
+    if text and minutes:
+        reminder_text = text
+        minutes = int(minutes)
         remind_time = datetime.now() + timedelta(minutes=minutes)
-        reminders[remind_time] = reminder_text
+        reminders.add(reminder_text, remind_time.timestamp())
         speak(f"Reminder set for {reminder_text} at {remind_time.strftime('%H:%M')}.")
         logging.info(f"Reminder set: {reminder_text} at {remind_time}")
     else:
         speak("Please specify a reminder and time in minutes.")
 
-async def check_reminders():
-    while True:
-        now = datetime.now()
-        for remind_time in list(reminders.keys()):
-            if now >= remind_time:
-                speak(f"Reminder: {reminders[remind_time]}")
-                logging.info(f"Reminder triggered: {reminders[remind_time]}")
-                del reminders[remind_time]
-        await asyncio.sleep(60)
-
-def ask_llm_sync(command):
-    global tokenizer, model
-    if not model or not tokenizer:
+def ask_llm_sync(command, on_text=None):
+    """Answer with the LLM; in streaming mode each sentence is spoken (and on_text called) as soon as it is generated"""
+    prompt = command.strip()
+    if not prompt:
+        speak("Please provide a question or message.")
+        return
+    if _reply.get() is not None:
+        # API clients never share the desktop conversation (or each other's) history
+        if not _answer_from_cache(prompt, on_text):
+            with governor.in_use('llm'):
+                _answer_stateless(prompt, on_text)
+        return
+    with _conversation_turn:
+        # Later answers depend on earlier turns, so only a fresh conversation uses the cache
+        cacheable = conversation.empty
+        if cacheable and _answer_from_cache(prompt, on_text, session=conversation):
+            return
+        with governor.in_use('llm'):
+            _answer_with_llm(prompt, on_text, cacheable)
+
+def _answer_from_cache(prompt, on_text, session=None):
+    """Speak a cached answer if there is one; it is added to session's history like a generated turn"""
+    cached = response_cache.get(prompt) if response_cache else None
+    if not cached:
+        return False
+    if on_text:
+        on_text(cached)
+    speak(cached)
+    logging.info(f"LLM answer (cached): {cached}")
+    if session is not None:
+        with governor.in_use('llm'):
+            if llm.load():
+                llm.record_turn(prompt, cached, session)
+    return True
+
+def _answer_stateless(prompt, on_text):
+    """API clients: a context-free answer, micro-batched with other clients' prompts when batching is on"""
+    if not llm.load():
+        speak("Transformers model not loaded. Please set LLM_MODEL_PATH in your .env file.")
+        return
+    try:
+        start = time.perf_counter()
+        if llm_batcher is not None:
+            answer = llm_batcher.generate(prompt)
+        else:
+            answer = llm.generate_batch([prompt])[0][0]
+        tracer.record('llm_generate', (time.perf_counter() - start) * 1000)
+        if answer and response_cache:
+            response_cache.put(prompt, answer)
+        answer = answer or "I'm not sure how to respond to that."
+        if on_text:
+            on_text(answer)
+        speak(answer)
+        logging.info(f"LLM answer (stateless, {(time.perf_counter() - start) * 1000:.0f} ms): {answer}")
+    except Exception as e:
+        speak("Sorry, there was an error with the AI model.")
+        logging.error(f"LLM error: {e}")
+
+def _answer_with_llm(prompt, on_text, cacheable=True):
+    if not llm.load():
         speak("Transformers model not loaded. Please set LLM_MODEL_PATH in your .env file.")
         return
     try:
-        prompt = command.strip()
-        if not prompt:
-            speak("Please provide a question or message.")
+        start = time.perf_counter()
+        llm_interrupt.clear()
+        llm_generating.set()
+        trace_id = current_trace()
+        first_audio = threading.Event()
+        def on_first_audio():
+            if not first_audio.is_set():
+                first_audio.set()
+                tracer.record('llm_first_audio', (time.perf_counter() - start) * 1000, trace_id)
+                logging.info(f"LLM time to first audio: {(time.perf_counter() - start) * 1000:.0f} ms")
+        if LLM_STREAMING:
+            splitter = SentenceSplitter()
+            parts = []
+            for text in llm.stream(prompt, session=conversation, stop_event=llm_interrupt):
+                if llm_interrupt.is_set():
+                    continue
+                if not parts:
+                    tracer.record('llm_first_token', (time.perf_counter() - start) * 1000)
+                parts.append(text)
+                if on_text:
+                    on_text(text)
+                for sentence in splitter.feed(text):
+                    speak(sentence, on_start=on_first_audio)
+            if not llm_interrupt.is_set():
+                for sentence in splitter.flush():
+                    speak(sentence, on_start=on_first_audio)
+            answer = ''.join(parts).strip()
+        else:
+            answer = llm.generate(prompt, session=conversation, stop_event=llm_interrupt)
+            if answer and not llm_interrupt.is_set():
+                if on_text:
+                    on_text(answer)
+                speak(answer, on_start=on_first_audio)
+        tracer.record('llm_generate', (time.perf_counter() - start) * 1000)
+        if llm_interrupt.is_set():
+            logging.info(f"LLM answer interrupted after {(time.perf_counter() - start) * 1000:.0f} ms: {answer}")
             return
-        inputs = tokenizer.encode(prompt, return_tensors="pt", max_length=512, truncation=True)
-        with torch.no_grad():
-            outputs = model.generate(
-                inputs,
-                max_length=inputs.shape[1] + 100,
-                temperature=0.7,
-                do_sample=True,
-                pad_token_id=tokenizer.eos_token_id,
-                eos_token_id=tokenizer.eos_token_id
-            )
-        response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        answer = response[len(prompt):].strip()
         if not answer:
             answer = "I'm not sure how to respond to that."
-        speak(answer)
-        logging.info(f"LLM answer: {answer}")
+            if on_text:
+                on_text(answer)
+            speak(answer, on_start=on_first_audio)
+        elif response_cache and cacheable:
+            response_cache.put(prompt, answer)
+        logging.info(f"LLM answer ({(time.perf_counter() - start) * 1000:.0f} ms): {answer}")
     except Exception as e:
         speak("Sorry, there was an error with the AI model.")
         logging.error(f"LLM error: {e}")
+    finally:
+        llm_generating.clear()
+
+# Actions for each intent in intent_router.INTENTS; slots are passed as keyword arguments
+INTENT_ACTIONS = {
+    'forecast': get_forecast_async,
+    'forecast_no_city': lambda: speak("Please specify a city for the forecast."),
+    'weather': get_weather_async,
+    'weather_no_city': lambda: speak("Please specify a city for the weather."),
+    'time': tell_time,
+    'news': get_news_async,
+    'reminder': set_reminder,
+    'reminder_incomplete': lambda: speak("Please specify a reminder and time in minutes."),
+    'joke': lambda: speak("Here's a joke: Why did the chicken join a band? Because it had the drumsticks!"),
+    'email': lambda: speak("Email functionality is not available in this demo."),
+    'open_reddit': lambda: speak("Opening Reddit..."),
+    'open_website': lambda: speak("Opening website..."),
+    'open_app': lambda: speak("Opening app..."),
+    'greeting': lambda: speak("Just chilling, ready to assist!"),
+    'exit': lambda: request_exit(),
+}
+
+_gui = None  # the AssistantGUI once the window is up
+
+def request_exit():
+    """Say goodbye and close the app on the Tk thread; SystemExit must never be raised on a pool worker"""
+    speak("Goodbye!")
+    if _gui is not None:
+        _gui.bus.call(_gui.quit_app)
 
 def match_command(command):
-    command = command.lower()
-    if "weather" in command:
-        import re
-        match = re.search(r'weather(?: in)? ([a-zA-Z ]+)', command)
-        if match:
-            city = match.group(1).strip()
-            return lambda c: get_weather(f"current weather in {city}")
-        elif "in" in command:
-            return lambda c: speak("Please specify a city for the weather.")
-        else:
-            return lambda c: speak("Please specify a city for the weather.")
-    if any(kw in command for kw in ["time", "what time", "current time", "tell me the time"]):
-        return lambda c: tell_time()
-    if any(kw in command for kw in ["news", "headlines"]):
-        return lambda c: get_news()
-    if any(kw in command for kw in ["remind", "reminder"]):
-        return set_reminder
-    if "joke" in command:
-        return lambda c: speak("Here's a joke: Why did the chicken join a band? Because it had the drumsticks!")
-    if "email" in command or "send mail" in command:
-        return lambda c: speak("Email functionality is not available in this demo.")
-    if "open" in command:
-        if "reddit" in command:
-            return lambda c: speak("Opening Reddit...")
-        elif "website" in command:
-            return lambda c: speak("Opening website...")
-        else:
-            return lambda c: speak("Opening app...")
-    if any(kw in command for kw in ["what's up", "hello", "hi", "hey"]):
-        return lambda c: speak("Just chilling, ready to assist!")
-    if any(kw in command for kw in ["exit", "quit", "close"]):
-        return lambda c: (speak("Goodbye!"), exit(0))
-    return ask_llm_sync
+    with tracer.span('route'):
+        intent, slots = router.route(command)
+    if intent is None:
+        return ask_llm_sync
+    action = INTENT_ACTIONS[intent]
+    if asyncio.iscoroutinefunction(action):
+        async def handler(c):
+            await action(**slots)
+    else:
+        def handler(c):
+            action(**slots)
+    handler.__name__ = intent
+    return handler
+
+# Commands run on a bounded worker pool; LLM jobs get their own single-slot lane
+COMMAND_WORKERS = int(os.getenv('COMMAND_WORKERS', '4'))
+COMMAND_QUEUE_SIZE = int(os.getenv('COMMAND_QUEUE_SIZE', '16'))
+COMMAND_TIMEOUT = float(os.getenv('COMMAND_TIMEOUT', '30'))
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '120'))
+# With batching, one llm worker per batch slot waits on the batch queue; the model still runs one generate() at a time
+scheduler = CommandScheduler(workers=COMMAND_WORKERS, queue_size=COMMAND_QUEUE_SIZE,
+                             timeout=COMMAND_TIMEOUT, llm_timeout=LLM_TIMEOUT, llm_workers=max(1, LLM_BATCH_SIZE))
+reminders.start(scheduler.loop)
+
+def close_api_client():
+    """Close both HTTP sessions; the aiohttp one lives on the scheduler loop, so close it there"""
+    api_client.close()
+    try:
+        scheduler.run_coroutine(api_client.close_async()).result(timeout=5)
+    except Exception as e:
+        logging.warning(f"Could not close the async HTTP session: {e}")
+
+def traced(func, trace_id, stage):
+    """Wrap a scheduler job so it runs inside trace_id and records its queue wait, run time and end-to-end latency"""
+    submitted = time.perf_counter()
+    def begin():
+        start = time.perf_counter()
+        tracer.record('queue_wait', (start - submitted) * 1000, trace_id)
+        return start
+    def end(start):
+        tracer.record(stage, (time.perf_counter() - start) * 1000, trace_id)
+        tracer.record('command_total', tracer.elapsed_ms(trace_id) or 0.0, trace_id)
+    if asyncio.iscoroutinefunction(func):
+        async def job(*args):
+            set_trace(trace_id)
+            start = begin()
+            try:
+                return await func(*args)
+            finally:
+                end(start)
+    else:
+        def job(*args):
+            token = set_trace(trace_id)
+            start = begin()
+            try:
+                return func(*args)
+            finally:
+                end(start)
+                reset_trace(token)
+    job.__name__ = getattr(func, '__name__', 'job')
+    return job
+
+def run_command(command, speak_aloud=False):
+    """Run a text command on the scheduler for an API client and return what it would have said"""
+    trace_id = tracer.new_trace('api', command)
+    token = set_trace(trace_id)
+    try:
+        handler = match_command(command)
+    finally:
+        reset_trace(token)
+    intent = handler.__name__ if handler is not ask_llm_sync else 'llm'
+    if intent == 'exit':
+        return {'intent': intent, 'reply': "Exit is not available over the API."}
+    replies = []
+    if asyncio.iscoroutinefunction(handler):
+        async def job(c):
+            _reply.set((replies, speak_aloud))
+            await handler(c)
+    else:
+        def job(c):
+            token = _reply.set((replies, speak_aloud))
+            try:
+                handler(c)
+            finally:
+                _reply.reset(token)
+    start = time.perf_counter()
+    submitted = scheduler.submit(traced(job, trace_id, f"handler.{intent}"), command,
+                                 lane='llm' if intent == 'llm' else 'general', name=intent)
+    submitted.future.result()
+    return {'intent': intent, 'reply': ' '.join(replies), 'ms': round((time.perf_counter() - start) * 1000),
+            'trace_id': trace_id}
+
+def health():
+    return {
+        'status': 'ok',
+        'llm_loaded': llm.model is not None,
+        'recognition_mode': _speech_pipeline.mode if _speech_pipeline is not None else RECOGNITION_MODE,
+        'pending': {'general': scheduler.pending('general'), 'llm': scheduler.pending('llm')},
+        'reminders': reminders.pending(),
+        'rss_mb': round(rss_mb() or 0, 1),
+        'models': governor.summary(),
+    }
+
+def serve(host, port):
+    """Headless mode: keep the models warm and answer text and audio commands over a localhost HTTP API"""
+    steps = [("speech recognizer", lambda: get_speech_pipeline().load()),
+             ("language model", llm.load)]
+    WarmUp(steps, on_progress=lambda text: text and logging.info(text)).start()
+    def transcribe(pcm, rate):
+        with governor.in_use('vosk'):
+            return get_speech_pipeline().transcribe(pcm, rate)
+    server = AssistantServer(run_command, transcribe, health,
+                             host=host, port=port, token=os.getenv('SERVE_TOKEN') or None)
+    print(f"Ovo API listening on http://{server.address[0]}:{server.address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        reminders.close()
+        close_api_client()
+        scheduler.shutdown()
 
 # Modern Assistant GUI using customtkinter
 class AssistantGUI:
@@ -347,8 +712,16 @@ class AssistantGUI:
         self.status_var = ctk.StringVar(value="Status: Idle")
         self.recognized_var = ctk.StringVar(value="Recognized: ")
         self.create_widgets()
-        self.assistant_thread = None
+        # Updates from worker threads go through the bus; the chat log keeps only the last CHAT_MAX_LINES lines
+        self.bus = UiBus(self.root)
+        self.chat = ChatView(self.chat_log, max_lines=CHAT_MAX_LINES)
+        self.bus.add_view(self.chat)
+        self.bus.start()
+        self.assistant_task = None
         self.running = False
+        self.warmup = None
+        if WARMUP_ON_START:
+            self.start_warmup()
 
     def create_widgets(self):
         self.status_label = ctk.CTkLabel(self.root, textvariable=self.status_var, font=("Segoe UI", 16))
@@ -365,6 +738,7 @@ class AssistantGUI:
         self.input_entry = ctk.CTkEntry(self.input_frame, textvariable=self.input_var, font=("Segoe UI", 13), width=500)
         self.input_entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
         self.input_entry.bind("<Return>", self.on_user_input)
+        self.input_entry.bind("<Key>", lambda event: barge_in("typing"), add="+")
         self.send_button = ctk.CTkButton(self.input_frame, text="Send", command=self.on_user_input, width=80)
         self.send_button.pack(side="left")
         self.start_button = ctk.CTkButton(self.root, text="Start Assistant", command=self.start_assistant)
@@ -373,11 +747,85 @@ class AssistantGUI:
         self.stop_button.pack(side="left", padx=10, pady=10)
         self.quit_button = ctk.CTkButton(self.root, text="Quit", command=self.quit_app)
         self.quit_button.pack(side="right", padx=10, pady=10)
+        self.metrics_button = ctk.CTkButton(self.root, text="Metrics", command=self.show_metrics, width=80)
+        self.metrics_button.pack(side="right", padx=10, pady=10)
+        self.metrics_window = None
+
+    def show_metrics(self):
+        """Debug panel with per-stage latency percentiles and recent traces, refreshed every second"""
+        if self.metrics_window is not None and self.metrics_window.winfo_exists():
+            self.metrics_window.focus()
+            return
+        self.metrics_window = ctk.CTkToplevel(self.root)
+        self.metrics_window.title("Ovo Metrics")
+        self.metrics_window.geometry("640x420")
+        self.metrics_text = ctk.CTkTextbox(self.metrics_window, font=("Consolas", 12), wrap="none")
+        self.metrics_text.pack(fill="both", expand=True, padx=10, pady=(10, 0))
+        buttons = ctk.CTkFrame(self.metrics_window, fg_color="transparent")
+        buttons.pack(fill="x", padx=10, pady=10)
+        ctk.CTkButton(buttons, text="Export JSON", width=120,
+                      command=lambda: self.export_metrics('metrics.json', tracer.to_json())).pack(side="left")
+        ctk.CTkButton(buttons, text="Export Prometheus", width=140,
+                      command=lambda: self.export_metrics('metrics.prom', tracer.to_prometheus())).pack(side="left", padx=10)
+        self.refresh_metrics()
+
+    def refresh_metrics(self):
+        if self.metrics_window is None or not self.metrics_window.winfo_exists():
+            return
+        self.metrics_text.delete("1.0", "end")
+        self.metrics_text.insert("end", f"RSS {format_mb(rss_mb())}: {governor.summary()}\n\n{tracer.format_table()}")
+        self.metrics_window.after(1000, self.refresh_metrics)
+
+    def export_metrics(self, name, content):
+        path = os.path.join(log_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        logging.info(f"Metrics exported to {path}")
+        messagebox.showinfo("Metrics", f"Saved to {path}")
+
+    def start_warmup(self):
+        steps = [("speech recognizer", lambda: get_speech_pipeline().load()),
+                 ("language model", llm.load),
+                 ("speech cache", prerender_phrases)]
+        self.warmup = WarmUp(steps, on_progress=self.on_warmup_progress)
+        self.warmup.start()
+
+    def on_warmup_progress(self, text):
+        if text is None:
+            text = "Status: Listening..." if self.running else "Status: Idle"
+        else:
+            text = f"Status: {text}"
+        self.bus.call(self.status_var.set, text)
 
     def add_message(self, text, is_user=False):
-        tag = "user" if is_user else "assistant"
-        self.chat_log.insert("end", ("You: " if is_user else "Ovo: ") + text + "\n")
-        self.chat_log.see("end")
+        """Add a chat line from any thread"""
+        self.chat.append(("You: " if is_user else "Ovo: ") + text + "\n")
+
+    def append_text(self, text):
+        """Append streamed text to the last line of the chat log from any thread"""
+        self.chat.append(text)
+
+    def run_llm(self, command):
+        """LLM lane job: stream the reply into the chat log as it is generated"""
+        self.append_text("Ovo: ")
+        try:
+            ask_llm_sync(command, on_text=self.append_text)
+        finally:
+            self.append_text("\n")
+
+    def on_llm_done(self, future):
+        """A timed-out or cancelled LLM job keeps running on its thread, so ask generate() to stop"""
+        if future.cancelled() or isinstance(future.exception(), TimeoutError):
+            llm_interrupt.set()
+
+    def on_job_done(self, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if isinstance(error, TimeoutError):
+            self.add_message("That took too long, so I stopped waiting for it.", is_user=False)
+        elif error is not None:
+            self.add_message(f"Error: {error}", is_user=False)
 
     def on_user_input(self, event=None):
         user_text = self.input_var.get().strip()
@@ -386,16 +834,28 @@ class AssistantGUI:
             self.input_var.set("")
             self.handle_user_command(user_text)
 
-    def handle_user_command(self, command):
-        handler = match_command(command)
+    def handle_user_command(self, command, trace_id=None):
+        trace_id = trace_id or tracer.new_trace('typed', command)
+        token = set_trace(trace_id)
+        try:
+            handler = match_command(command)
+        finally:
+            reset_trace(token)
         if handler:
             self.add_message("Processing...", is_user=False)
-            def run_handler():
-                try:
-                    handler(command)
-                except Exception as e:
-                    self.add_message(f"Error: {e}", is_user=False)
-            threading.Thread(target=run_handler, daemon=True).start()
+            try:
+                if handler is ask_llm_sync:
+                    job = scheduler.submit(traced(self.run_llm, trace_id, 'handler.llm'), command,
+                                           lane='llm', name='ask_llm')
+                    job.future.add_done_callback(self.on_llm_done)
+                else:
+                    job = scheduler.submit(traced(handler, trace_id, f"handler.{handler.__name__}"), command,
+                                           name=handler.__name__)
+            except SchedulerBusy as e:
+                logging.warning(f"Command rejected: {e}")
+                self.add_message("I'm still busy with earlier requests, please try again in a moment.", is_user=False)
+                return
+            job.future.add_done_callback(self.on_job_done)
         else:
             self.add_message("I don't understand that command.", is_user=False)
 
@@ -403,53 +863,69 @@ class AssistantGUI:
         if not self.running:
             self.running = True
             self.status_var.set("Status: Listening...")
-            self.assistant_thread = threading.Thread(target=self.run_assistant, daemon=True)
-            self.assistant_thread.start()
+            self.assistant_task = scheduler.run_coroutine(self.assistant_loop())
 
     def stop_assistant(self):
+        """Safe from any thread: the status label is updated through the UI bus"""
         self.running = False
-        self.status_var.set("Status: Stopped")
-
-    def run_assistant(self):
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(self.assistant_loop())
+        self.bus.call(self.status_var.set, "Status: Stopped")
 
     async def assistant_loop(self):
         self.add_message("Ovo started.", is_user=False)
+        loop = asyncio.get_running_loop()
+        pipeline = get_speech_pipeline()
+        try:
+            await loop.run_in_executor(None, pipeline.start)
+        except Exception as e:
+            logging.error(f"Vosk error: {e}")
+            if pipeline.mode == 'cloud':
+                speak("Could not open the microphone.")
+                self.stop_assistant()
+                return
+            speak("Error with offline recognition. Trying cloud...")
+            pipeline.mode = 'cloud'
+            await loop.run_in_executor(None, pipeline.start)
         speak("Ovo is ready for your command")
-        asyncio.create_task(check_reminders())
         while self.running:
-            try:
-                command = await asyncio.wait_for(listen(), timeout=300)
-                if command:
-                    self.recognized_var.set(f"Recognized: {command}")
-                    self.add_message(command, is_user=True)
-                    handler = match_command(command)
-                    if handler:
-                        self.add_message("Processing...", is_user=False)
-                        def run_handler():
-                            try:
-                                handler(command)
-                            except Exception as e:
-                                self.add_message(f"Error: {e}", is_user=False)
-                        threading.Thread(target=run_handler, daemon=True).start()
-                    else:
-                        self.add_message("I don't understand that command.", is_user=False)
-            except asyncio.TimeoutError:
-                self.add_message("Listening timed out. Please try again.", is_user=False)
+            command, trace_id = await loop.run_in_executor(None, pipeline.get_utterance, 0.5)
+            if command:
+                self.bus.call(self.recognized_var.set, f"Recognized: {command}")
+                self.add_message(command, is_user=True)
+                self.handle_user_command(command, trace_id)
+        await loop.run_in_executor(None, pipeline.stop)
+        governor.touch('vosk')
+        logging.info(f"Speech pipeline metrics: {pipeline.metrics()}")
         self.add_message("Ovo stopped.", is_user=False)
 
     def quit_app(self, *args):
         self.running = False
+        if _speech_pipeline is not None:
+            _speech_pipeline.stop()
+            _speech_pipeline.capture.close()
+        reminders.close()
+        governor.stop()
+        logging.info(f"Memory at exit: RSS {format_mb(rss_mb())} ({governor.summary()})")
+        if tts_cache is not None:
+            logging.info(f"TTS cache: {tts_cache.stats()}")
+        close_api_client()
+        scheduler.shutdown()
         self.root.quit()
 
 # Main entry point
 def main():
+    parser = argparse.ArgumentParser(description="Ovo desktop assistant")
+    parser.add_argument("--serve", action="store_true", help="run headless with a localhost HTTP API")
+    parser.add_argument("--host", default=os.getenv('SERVE_HOST', '127.0.0.1'))
+    parser.add_argument("--port", type=int, default=int(os.getenv('SERVE_PORT', '8765')))
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.host, args.port)
+        return
+    global _gui
     root = ctk.CTk()
-    app = AssistantGUI(root)
+    app = _gui = AssistantGUI(root)
     root.protocol("WM_DELETE_WINDOW", app.quit_app)
+    root.after(0, lambda: logging.info(f"Startup timing: window shown after {(time.perf_counter() - _process_start) * 1000:.0f} ms"))
     root.mainloop()
 
 if __name__ == "__main__":
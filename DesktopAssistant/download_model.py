@@ -1,40 +1,83 @@
+import argparse
 import os
 from transformers import AutoTokenizer, AutoModelForCausalLM
 import torch
 
-def download_model():
+from llm_engine import INT8_WEIGHTS, quantize_int8
+
+def download_model(model_name="microsoft/DialoGPT-medium", local_path="llm-model"):
     """Download the model and tokenizer locally"""
-    model_name = "microsoft/DialoGPT-medium"
-    local_path = "llm-model"
-    
     print(f"Downloading {model_name} to {local_path}...")
-    
+
     try:
         # Download tokenizer
         print("Downloading tokenizer...")
         tokenizer = AutoTokenizer.from_pretrained(model_name)
         tokenizer.save_pretrained(local_path)
-        
+
         # Download model
         print("Downloading model (this may take a while)...")
         model = AutoModelForCausalLM.from_pretrained(model_name)
-        model.save_pretrained(local_path)
-        
+        model.save_pretrained(local_path, safe_serialization=True)
+
         print(f"✅ Model downloaded successfully to {local_path}/")
-        print(f"📁 Files created:")
-        
-        # List the downloaded files
-        for root, dirs, files in os.walk(local_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                size = os.path.getsize(file_path)
-                print(f"   {file_path} ({size:,} bytes)")
-                
+        list_files(local_path)
+
     except Exception as e:
         print(f"❌ Error downloading model: {e}")
         return False
-    
+
     return True
 
+def convert_model(local_path="llm-model", precision="int8"):
+    """Write a reduced-memory copy of the local model to <local_path>-<precision>"""
+    output_path = f"{local_path}-{precision}"
+    print(f"Converting {local_path} to {precision} in {output_path}...")
+
+    try:
+        tokenizer = AutoTokenizer.from_pretrained(local_path)
+        tokenizer.save_pretrained(output_path)
+        if precision == "bf16":
+            # safetensors are memory-mapped at load time, so only touched pages become resident
+            model = AutoModelForCausalLM.from_pretrained(local_path, torch_dtype=torch.bfloat16, low_cpu_mem_usage=True)
+            model.save_pretrained(output_path, safe_serialization=True)
+        elif precision == "int8":
+            model = AutoModelForCausalLM.from_pretrained(local_path, low_cpu_mem_usage=True)
+            model.config.save_pretrained(output_path)
+            # Quantized linear layers hold packed weights that safetensors cannot store, so they go in a torch
+            # state_dict; llm_engine.load_model rebuilds the model from the config above and loads it weights-only
+            torch.save(quantize_int8(model).state_dict(), os.path.join(output_path, INT8_WEIGHTS))
+        else:
+            print(f"❌ Unknown precision: {precision}")
+            return False
+
+        print(f"✅ Converted model written to {output_path}/")
+        print(f"   Use it with LLM_MODEL_PATH={output_path} and LLM_PRECISION={precision}")
+        list_files(output_path)
+
+    except Exception as e:
+        print(f"❌ Error converting model: {e}")
+        return False
+
+    return True
+
+def list_files(path):
+    print(f"📁 Files created:")
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            file_path = os.path.join(root, file)
+            size = os.path.getsize(file_path)
+            print(f"   {file_path} ({size:,} bytes)")
+
 if __name__ == "__main__":
-    download_model() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download the Ovo language model and optionally convert it")
+    parser.add_argument("--model", default="microsoft/DialoGPT-medium", help="Hugging Face model to download")
+    parser.add_argument("--path", default="llm-model", help="local model directory")
+    parser.add_argument("--convert", nargs="+", choices=["int8", "bf16"], default=[],
+                        help="also write reduced-memory copies of the model")
+    parser.add_argument("--skip-download", action="store_true", help="only convert an already downloaded model")
+    args = parser.parse_args()
+
+    if args.skip_download or download_model(args.model, args.path):
+        for precision in args.convert:
+            convert_model(args.path, precision)
@@ -0,0 +1,143 @@
+import asyncio
+import collections
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from lazy_loader import lazy_import
+from tracing import tracer
+
+aiohttp = lazy_import('aiohttp')
+
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+
+
+class _Call:
+    """An in-flight request that identical concurrent requests wait on instead of repeating"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class HttpClient:
+    """Shared requests.Session with connection pooling, per-call timeouts, a TTL cache and request coalescing"""
+    def __init__(self, pool_size=10, max_cache_entries=128, retries=2):
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({'GET'}))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.pool_size = pool_size
+        self.max_cache_entries = max_cache_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._cache = collections.OrderedDict()  # key -> (expires_at, status_code, data)
+        self._inflight = {}
+        self._async_inflight = {}
+        self._aio_session = None
+        self._lock = threading.Lock()
+
+    def _cached(self, key, url):
+        """Return the cached (status_code, data) for key if still fresh; caller holds the lock"""
+        cached = self._cache.get(key)
+        if cached is None or cached[0] <= time.monotonic():
+            return None
+        self.hits += 1
+        self._cache.move_to_end(key)
+        logging.info(f"HTTP cache hit: {url} ({self.stats()})")
+        return cached[1], cached[2]
+
+    def _store(self, key, status_code, data, ttl):
+        if status_code != 200 or ttl <= 0:
+            return
+        with self._lock:
+            self._cache[key] = (time.monotonic() + ttl, status_code, data)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+
+    def get_json(self, url, params=None, ttl=0, timeout=DEFAULT_TIMEOUT):
+        """GET url and return (status_code, parsed JSON or None); 200 responses are cached for ttl seconds"""
+        key = (url, tuple(sorted((params or {}).items())))
+        with self._lock:
+            cached = self._cached(key, url)
+            if cached is not None:
+                return cached
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            start = time.perf_counter()
+            response = self.session.get(url, params=params, timeout=timeout)
+            data = response.json() if response.status_code == 200 else None
+            call.result = (response.status_code, data)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            tracer.record('http', elapsed_ms)
+            logging.info(f"HTTP GET {url}: {response.status_code} in {elapsed_ms:.0f} ms")
+            self._store(key, response.status_code, data, ttl)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+    async def get_json_async(self, url, params=None, ttl=0, timeout=DEFAULT_TIMEOUT):
+        """Native-async get_json on the calling event loop; shares the cache with the blocking version"""
+        key = (url, tuple(sorted((params or {}).items())))
+        with self._lock:
+            cached = self._cached(key, url)
+            if cached is not None:
+                return cached
+            task = self._async_inflight.get(key)
+            if task is None:
+                self.misses += 1
+                task = asyncio.ensure_future(self._fetch_async(key, url, params, ttl, timeout))
+                self._async_inflight[key] = task
+                task.add_done_callback(lambda _: self._async_inflight.pop(key, None))
+            else:
+                self.coalesced += 1
+        # shield: one waiter being cancelled must not cancel the fetch the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _fetch_async(self, key, url, params, ttl, timeout):
+        if self._aio_session is None or self._aio_session.closed:
+            self._aio_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+        connect, read = timeout
+        start = time.perf_counter()
+        async with self._aio_session.get(url, params={k: str(v) for k, v in (params or {}).items()},
+                                         timeout=aiohttp.ClientTimeout(connect=connect, sock_read=read)) as response:
+            data = await response.json(content_type=None) if response.status == 200 else None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        tracer.record('http', elapsed_ms)
+        logging.info(f"HTTP GET {url}: {response.status} in {elapsed_ms:.0f} ms (async)")
+        self._store(key, response.status, data, ttl)
+        return response.status, data
+
+    def stats(self):
+        return f"hits={self.hits}, misses={self.misses}, coalesced={self.coalesced}"
+
+    def close(self):
+        self.session.close()
+
+    async def close_async(self):
+        if self._aio_session is not None:
+            await self._aio_session.close()
@@ -0,0 +1,67 @@
+import re
+
+# Ordered intent table: (intent, trigger phrases, pattern or None). Earlier entries win when several
+# are triggered. The pattern must also match for the intent to be chosen; its named groups become slots.
+INTENTS = [
+    ('forecast', ['forecast'], r"\bforecast(?: for| in)?\s+(?P<city>(?!in\b|for\b)[a-z][a-z '-]*)"),
+    ('forecast_no_city', ['forecast'], None),
+    ('weather', ['weather'], r"\bweather(?: in| for)?\s+(?P<city>(?!in\b|for\b)[a-z][a-z '-]*)"),
+    ('weather_no_city', ['weather'], None),
+    ('time', ['time'], None),
+    ('news', ['news', 'headlines'], None),
+    ('reminder', ['remind', 'reminder'], r"\bremind(?:er)?(?:\s+me)?(?:\s+to)?\s+(?P<text>.+?)\s+in\s+(?P<minutes>\d+)\s+minutes?\b"),
+    ('reminder_incomplete', ['remind', 'reminder'], None),
+    ('joke', ['joke', 'jokes'], None),
+    ('email', ['email', 'e-mail', 'send mail'], None),
+    ('open_reddit', ['reddit'], r"\bopen\b.*\breddit\b"),
+    ('open_website', ['website'], r"\bopen\b.*\bwebsite\b"),
+    ('open_app', ['open'], None),
+    ('greeting', ["what's up", 'whats up', 'hello', 'hi', 'hey'], None),
+    # Exit closes the app, so only a bare command counts: "how close is the moon" must not match
+    ('exit', ['exit', 'quit', 'close'],
+     r"^\s*(?:please\s+)?(?:exit|quit|close)(?:\s+(?:ovo|the assistant|the app|the window))?\s*[.!]?\s*$"),
+]
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+class IntentRouter:
+    """Routes a command in one pass over its tokens with a phrase trie compiled from the intent table"""
+    def __init__(self, intents=INTENTS):
+        self.intents = [(name, re.compile(pattern) if pattern else None) for name, _, pattern in intents]
+        self._trie = {}
+        for priority, (_, phrases, _) in enumerate(intents):
+            for phrase in phrases:
+                node = self._trie
+                for token in tokenize(phrase):
+                    node = node.setdefault(token, {})
+                node.setdefault(None, set()).add(priority)
+
+    def route(self, command):
+        """Return (intent, slots) for command, or (None, {}) when no intent matches"""
+        command = command.lower()
+        tokens = tokenize(command)
+        triggered = set()
+        for i in range(len(tokens)):
+            node = self._trie
+            for token in tokens[i:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                if None in node:
+                    triggered |= node[None]
+        for priority in sorted(triggered):
+            name, pattern = self.intents[priority]
+            if pattern is None:
+                return name, {}
+            match = pattern.search(command)
+            if match:
+                return name, match.groupdict()
+        return None, {}
+
+
+router = IntentRouter()
@@ -0,0 +1,99 @@
+import importlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+_timings = []  # (start, depth, label, elapsed) in the order blocks finished
+_timings_lock = threading.Lock()
+_reported = 0
+_nesting = threading.local()
+
+
+def _depth():
+    return getattr(_nesting, 'depth', 0)
+
+
+@contextmanager
+def timed(label):
+    """Record how long the wrapped block takes in the startup timing report; blocks may nest"""
+    depth = _depth()
+    _nesting.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _nesting.depth = depth
+        with _timings_lock:
+            _timings.append((start, depth, label, elapsed))
+        logging.info(f"Startup timing: {label} took {elapsed * 1000:.0f} ms")
+
+
+def log_timing_report():
+    """Log the timings recorded since the last report, nested steps indented under their parent.
+
+    Called inside a timed block it does nothing, so a model loaded by a warm-up step waits for the
+    warm-up's own report. The total only adds up top-level steps, because nested ones are already
+    counted in their parent.
+    """
+    global _reported
+    if _depth():
+        return
+    with _timings_lock:
+        timings = sorted(_timings[_reported:])
+        _reported = len(_timings)
+    if not timings:
+        return
+    lines = [f"  {'  ' * depth + label:<36} {elapsed * 1000:>8.0f} ms" for _, depth, label, elapsed in timings]
+    total = sum(elapsed for _, depth, _, elapsed in timings if depth == 0)
+    logging.info("Startup timing report:\n" + "\n".join(lines) + f"\n  {'total':<36} {total * 1000:>8.0f} ms")
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported the first time one of its attributes is used"""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    with timed(f"import {self._name}"):
+                        self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+class WarmUp:
+    """Runs (label, function) steps on a background thread and reports progress after each one"""
+    def __init__(self, steps, on_progress=None):
+        self.steps = steps
+        self.on_progress = on_progress or (lambda text: None)
+        self.done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        total = len(self.steps)
+        for i, (label, step) in enumerate(self.steps, 1):
+            self.on_progress(f"Warming up {label} ({i}/{total})...")
+            try:
+                with timed(f"warm-up {label}"):
+                    step()
+            except Exception as e:
+                logging.error(f"Warm-up of {label} failed: {e}")
+        self.done.set()
+        self.on_progress(None)
+        log_timing_report()
@@ -0,0 +1,348 @@
+import logging
+import os
+import queue
+import re
+import threading
+import time
+
+from lazy_loader import lazy_import, log_timing_report, timed
+
+torch = lazy_import('torch')
+transformers = lazy_import('transformers')
+pytorch_utils = lazy_import('transformers.pytorch_utils')
+
+PRECISIONS = ('fp32', 'bf16', 'int8')
+INT8_WEIGHTS = 'model-int8.state.pt'
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+class SentenceSplitter:
+    """Buffers streamed text and hands back each sentence as soon as it is complete"""
+    def __init__(self):
+        self._buffer = ''
+
+    def feed(self, text):
+        self._buffer += text
+        parts = _SENTENCE_END.split(self._buffer)
+        self._buffer = parts.pop()
+        return [part.strip() for part in parts if part.strip()]
+
+    def flush(self):
+        rest = self._buffer.strip()
+        self._buffer = ''
+        return [rest] if rest else []
+
+
+def linearize(model):
+    """Swap GPT-2 style Conv1D layers for nn.Linear so dynamic quantization can see them"""
+    for module in list(model.modules()):
+        for name, child in list(module.named_children()):
+            if isinstance(child, pytorch_utils.Conv1D):
+                in_features, out_features = child.weight.shape
+                linear = torch.nn.Linear(in_features, out_features, dtype=child.weight.dtype)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(module, name, linear)
+    return model
+
+
+def quantize_int8(model):
+    """Dynamic int8 quantization of every linear layer (CPU inference only)"""
+    return torch.quantization.quantize_dynamic(linearize(model.float()), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_model(model_path, precision='fp32'):
+    """Load a causal LM at the requested precision with memory-mapped, low-memory weight loading"""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown LLM precision {precision!r}, expected one of {', '.join(PRECISIONS)}")
+    int8_weights = os.path.join(model_path, INT8_WEIGHTS)
+    if precision == 'int8' and os.path.exists(int8_weights):
+        # Written by download_model.py --convert int8: rebuild the quantized skeleton from the config and load the
+        # packed weights into it, so the file holds only tensors and never has to be unpickled as code
+        config = transformers.AutoConfig.from_pretrained(model_path)
+        model = quantize_int8(transformers.AutoModelForCausalLM.from_config(config))
+        model.load_state_dict(torch.load(int8_weights, map_location='cpu', weights_only=True))
+        return model
+    dtype = torch.bfloat16 if precision == 'bf16' else torch.float32
+    model = transformers.AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=dtype, low_cpu_mem_usage=True)
+    if precision == 'int8':
+        model = quantize_int8(model)
+    return model
+
+
+def stopping_criteria(stop_event):
+    """StoppingCriteriaList that ends generate() at the next token once stop_event is set"""
+    class EventStoppingCriteria(transformers.StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return torch.full((input_ids.shape[0],), stop_event.is_set(), dtype=torch.bool, device=input_ids.device)
+    return transformers.StoppingCriteriaList([EventStoppingCriteria()])
+
+
+class LLMEngine:
+    """Loads the causal LM on first use and generates replies, either all at once or streamed"""
+    def __init__(self, model_path, precision='fp32', num_threads=None, max_new_tokens=100, temperature=0.7,
+                 stream_timeout=60):
+        self.model_path = model_path
+        self.precision = precision
+        self.num_threads = num_threads
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.stream_timeout = stream_timeout
+        self.tokenizer = None
+        self.model = None
+        self._lock = threading.Lock()
+        self._generate_lock = threading.Lock()  # one generate() at a time, batched or not
+        self._load_attempted = False
+
+    def load(self):
+        """Load the tokenizer and model once; returns True if the model is available"""
+        with self._lock:
+            if self._load_attempted:
+                return self.model is not None
+            self._load_attempted = True
+            try:
+                if self.num_threads:
+                    torch.set_num_threads(self.num_threads)
+                with timed("load tokenizer"):
+                    self.tokenizer = transformers.AutoTokenizer.from_pretrained(self.model_path)
+                with timed(f"load LLM weights ({self.precision})"):
+                    self.model = load_model(self.model_path, self.precision)
+                self.model.eval()
+                if self.tokenizer.pad_token is None:
+                    self.tokenizer.pad_token = self.tokenizer.eos_token
+                logging.info(f"Transformers model loaded: {self.model_path} ({self.precision}, "
+                             f"{torch.get_num_threads()} threads)")
+            except Exception as e:
+                self.tokenizer = None
+                self.model = None
+                logging.error(f"Failed to load transformers model: {e}")
+            log_timing_report()  # without a warm-up this is the first model load
+            return self.model is not None
+
+    def unload(self):
+        """Free the model and tokenizer; the next load() reads them from disk again"""
+        with self._lock:
+            if self.model is None:
+                return False
+            self.model = None
+            self.tokenizer = None
+            self._load_attempted = False
+        logging.info(f"Transformers model unloaded: {self.model_path}")
+        return True
+
+    def _encode(self, prompt):
+        return self.tokenizer.encode(prompt, return_tensors="pt", max_length=512, truncation=True)
+
+    def _generate_kwargs(self, stop_event=None):
+        kwargs = dict(
+            max_new_tokens=self.max_new_tokens,
+            temperature=self.temperature,
+            do_sample=True,
+            pad_token_id=self.tokenizer.eos_token_id,
+            eos_token_id=self.tokenizer.eos_token_id,
+        )
+        if stop_event is not None:
+            kwargs['stopping_criteria'] = stopping_criteria(stop_event)
+        return kwargs
+
+    def _generate(self, prompt, session=None, streamer=None, stop_event=None):
+        """Run generate() for prompt, continuing session's history and KV cache when one is given"""
+        if session is None:
+            inputs = self._encode(prompt)
+            with self._generate_lock, torch.no_grad():
+                outputs = self.model.generate(inputs, attention_mask=torch.ones_like(inputs), streamer=streamer,
+                                              **self._generate_kwargs(stop_event))
+            return self.tokenizer.decode(outputs[0][inputs.shape[1]:], skip_special_tokens=True).strip()
+        with session.lock:
+            new_ids = self._encode(prompt + self.tokenizer.eos_token)
+            inputs, past = session.prepare(new_ids, reserve=self.max_new_tokens)
+            outputs = None
+            try:
+                with self._generate_lock, torch.no_grad():
+                    outputs = self.model.generate(inputs, attention_mask=torch.ones_like(inputs), streamer=streamer,
+                                                  past_key_values=past, return_dict_in_generate=True,
+                                                  **self._generate_kwargs(stop_event))
+            finally:
+                if outputs is None:
+                    session.reset()
+            session.commit(outputs.sequences, outputs.past_key_values, self.tokenizer.eos_token_id)
+            return self.tokenizer.decode(outputs.sequences[0][inputs.shape[1]:], skip_special_tokens=True).strip()
+
+    def generate(self, prompt, session=None, stop_event=None):
+        """Return the whole continuation of prompt in one go; setting stop_event ends it early"""
+        return self._generate(prompt, session, stop_event=stop_event)
+
+    def record_turn(self, prompt, reply, session):
+        """Add a turn answered without generate() (e.g. from the response cache) to session's history"""
+        with session.lock:
+            new_ids = self._encode(prompt + self.tokenizer.eos_token)
+            reply_ids = self._encode(reply + self.tokenizer.eos_token)
+            inputs, past = session.prepare(new_ids, reserve=reply_ids.shape[1])
+            session.commit(torch.cat([inputs, reply_ids], dim=-1), past, self.tokenizer.eos_token_id)
+
+    def generate_batch(self, prompts):
+        """Continue several independent prompts in one generate() call; returns the replies and new token count"""
+        self.tokenizer.padding_side = 'left'  # decoder-only models continue from the last position of every row
+        # eos ends the user's turn, as in the session path, so the model replies instead of continuing it
+        prompts = [prompt + self.tokenizer.eos_token for prompt in prompts]
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True, max_length=512, truncation=True)
+        with self._generate_lock, torch.no_grad():
+            outputs = self.model.generate(inputs.input_ids, attention_mask=inputs.attention_mask,
+                                          **self._generate_kwargs())
+        new_ids = outputs[:, inputs.input_ids.shape[1]:]
+        # Rows that finish early are padded with pad_token (= eos) up to the longest reply
+        new_tokens = int((new_ids != self.tokenizer.pad_token_id).sum())
+        replies = [text.strip() for text in self.tokenizer.batch_decode(new_ids, skip_special_tokens=True)]
+        return replies, new_tokens
+
+    def stream(self, prompt, session=None, stop_event=None):
+        """Yield decoded text pieces of the continuation while generate() runs on a worker thread"""
+        streamer = transformers.TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True,
+                                                     timeout=self.stream_timeout)
+        errors = []
+        def run():
+            try:
+                self._generate(prompt, session, streamer, stop_event)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        for text in streamer:
+            yield text
+        thread.join()
+        if errors:
+            raise errors[0]
+
+
+class BatchQueue:
+    """Micro-batches concurrent stateless prompts into one generate() call.
+
+    The first waiting prompt opens a window of window_ms; every prompt that arrives before it closes,
+    up to max_batch, is padded into the same batch and each caller gets its own reply back.
+    """
+    def __init__(self, engine, max_batch=4, window_ms=20, on_batch=None):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.window_ms = window_ms
+        self.on_batch = on_batch  # called with (batch_size, new_tokens, seconds) after every batch
+        self.batches = 0
+        self.requests = 0
+        self._pending = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def generate(self, prompt):
+        """Queue prompt for the next batch and block until its reply is ready"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+                self._thread.start()
+        request = {'prompt': prompt, 'done': threading.Event(), 'reply': None, 'error': None}
+        self._pending.put(request)
+        request['done'].wait()
+        if request['error'] is not None:
+            raise request['error']
+        return request['reply']
+
+    def _collect(self):
+        batch = [self._pending.get()]
+        deadline = time.perf_counter() + self.window_ms / 1000
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            try:
+                replies, new_tokens = self.engine.generate_batch([request['prompt'] for request in batch])
+            except Exception as e:
+                for request in batch:
+                    request['error'] = e
+                    request['done'].set()
+                continue
+            elapsed = time.perf_counter() - start
+            for request, reply in zip(batch, replies):
+                request['reply'] = reply
+                request['done'].set()
+            self.batches += 1
+            self.requests += len(batch)
+            logging.info(f"LLM batch of {len(batch)}: {new_tokens} tokens in {elapsed * 1000:.0f} ms "
+                         f"({new_tokens / max(elapsed, 1e-6):.1f} tokens/s)")
+            if self.on_batch is not None:
+                self.on_batch(len(batch), new_tokens, elapsed)
+
+
+def cache_length(past_key_values):
+    if past_key_values is None:
+        return 0
+    if hasattr(past_key_values, 'get_seq_length'):
+        return past_key_values.get_seq_length()
+    return past_key_values[0][0].shape[-2]
+
+
+class ConversationSession:
+    """Token history of one dialogue plus the KV cache covering it, trimmed to a sliding token budget"""
+    def __init__(self, max_tokens=512):
+        self.max_tokens = max_tokens
+        self.history = None
+        self.turn_lengths = []
+        self.past_key_values = None
+        self.lock = threading.Lock()
+
+    def reset(self):
+        self.history = None
+        self.turn_lengths = []
+        self.past_key_values = None
+
+    @property
+    def empty(self):
+        return self.history is None
+
+    def drop_cache(self):
+        """Free the KV cache but keep the token history; the next turn prefills it again"""
+        with self.lock:
+            self.past_key_values = None
+
+    def prepare(self, new_ids, reserve):
+        """Return the input ids for the next turn and the cache to resume from"""
+        history_len = 0 if self.history is None else self.history.shape[1]
+        if history_len + new_ids.shape[1] + reserve > self.max_tokens:
+            self._trim(min(self.max_tokens // 2, self.max_tokens - new_ids.shape[1] - reserve))
+        if self.history is None:
+            inputs = new_ids
+        else:
+            inputs = torch.cat([self.history, new_ids], dim=-1)
+        cached = cache_length(self.past_key_values)
+        logging.info(f"LLM prefill: {inputs.shape[1] - cached} new tokens, {cached} reused from KV cache")
+        return inputs, self.past_key_values
+
+    def commit(self, sequences, past_key_values, eos_token_id):
+        """Record the finished turn; the cache stays valid because it only covers tokens already in history"""
+        history_len = 0 if self.history is None else self.history.shape[1]
+        if sequences[0, -1].item() != eos_token_id:
+            sequences = torch.cat([sequences, sequences.new_full((1, 1), eos_token_id)], dim=-1)
+        self.history = sequences
+        self.turn_lengths.append(sequences.shape[1] - history_len)
+        self.past_key_values = past_key_values
+
+    def _trim(self, budget):
+        """Drop the oldest turns until the history fits budget; positions shift, so the cache is rebuilt"""
+        dropped = 0
+        while self.turn_lengths and self.history.shape[1] - dropped > max(budget, 0):
+            dropped += self.turn_lengths.pop(0)
+        if not self.turn_lengths:
+            self.history = None
+        else:
+            self.history = self.history[:, dropped:]
+        self.past_key_values = None
+        logging.info(f"Conversation trimmed by {dropped} tokens to stay within {self.max_tokens}; KV cache reset")
@@ -0,0 +1,50 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class LogWriter(logging.handlers.QueueListener):
+    """QueueListener whose stop() drains the queue, closes the file and is safe to call more than once"""
+    running = False
+
+    def start(self):
+        super().start()
+        self.running = True
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        super().stop()
+        for handler in self.handlers:
+            handler.close()
+
+
+def install_queue_handler(level=logging.INFO):
+    """Route every log record through an in-memory queue so callers never wait on file I/O.
+
+    Records are held in the queue until start_writer() attaches the file handler, so logging can be
+    installed before the settings that size the log file have been read.
+    """
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    return log_queue
+
+
+def start_writer(log_queue, path, max_bytes=5 * 1024 * 1024, backups=3):
+    """Write queued records to path on a background thread, rotating the file at max_bytes"""
+    if max_bytes > 0:
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+    else:
+        handler = logging.FileHandler(path, encoding='utf-8')
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = LogWriter(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    # Records logged just before exit are still written
+    atexit.register(listener.stop)
+    return listener
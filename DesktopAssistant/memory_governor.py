@@ -0,0 +1,148 @@
+import ctypes
+import ctypes.util
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+def rss_mb():
+    """Current resident memory of this process in MB, or None if it cannot be read"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def release_memory():
+    """Collect garbage and, on glibc, hand freed heap pages back to the OS so RSS actually drops"""
+    gc.collect()
+    if sys.platform.startswith('linux'):
+        try:
+            ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6').malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+
+def format_mb(value):
+    return f"{value:.0f} MB" if value is not None else "unknown"
+
+
+class _Resource:
+    def __init__(self, name, idle_seconds, is_loaded, unload, is_busy):
+        self.name = name
+        self.idle_seconds = idle_seconds
+        self.is_loaded = is_loaded
+        self.unload = unload
+        self.is_busy = is_busy or (lambda: False)
+        self.last_used = time.monotonic()
+        self.users = 0
+        self.loads = 0
+        self.unloads = 0
+
+
+class MemoryGovernor:
+    """Unloads heavy models that have been idle longer than their threshold; they reload on next use.
+
+    Callers wrap each use in `with governor.in_use(name):` so a model is never unloaded mid-request.
+    Unloads, reloads and periodic resident-memory readings are logged for tuning the thresholds.
+    """
+    def __init__(self, check_interval=30, report_interval=300):
+        self.check_interval = check_interval
+        self.report_interval = report_interval
+        self.events = []  # (time, name, 'load' | 'unload', rss_mb)
+        self._resources = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name, idle_seconds, is_loaded, unload, is_busy=None):
+        """Track a model; idle_seconds <= 0 keeps it loaded forever"""
+        with self._lock:
+            self._resources[name] = _Resource(name, idle_seconds, is_loaded, unload, is_busy)
+
+    def start(self):
+        if self._thread is None and any(r.idle_seconds > 0 for r in self._resources.values()):
+            self._thread = threading.Thread(target=self._run, name="memory-governor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @contextmanager
+    def in_use(self, name):
+        with self._lock:
+            resource = self._resources[name]
+            resource.users += 1
+            was_loaded = resource.is_loaded()
+        try:
+            yield
+        finally:
+            with self._lock:
+                resource.users -= 1
+                resource.last_used = time.monotonic()
+                reloaded = not was_loaded and resource.is_loaded() and resource.unloads > 0
+                if reloaded:
+                    resource.loads += 1
+            if reloaded:
+                self._event(name, 'load')
+
+    def touch(self, name):
+        with self._lock:
+            self._resources[name].last_used = time.monotonic()
+
+    def _run(self):
+        last_report = time.monotonic()
+        while not self._stop.wait(self.check_interval):
+            self.check()
+            if time.monotonic() - last_report >= self.report_interval:
+                last_report = time.monotonic()
+                logging.info(f"Memory: RSS {format_mb(rss_mb())} ({self.summary()})")
+
+    def check(self):
+        """Unload every resource past its idle threshold; returns the names unloaded"""
+        unloaded = []
+        now = time.monotonic()
+        with self._lock:
+            for resource in self._resources.values():
+                if (resource.idle_seconds <= 0 or resource.users or not resource.is_loaded() or resource.is_busy()
+                        or now - resource.last_used < resource.idle_seconds):
+                    continue
+                before = rss_mb()
+                try:
+                    if resource.unload() is False:
+                        continue
+                except Exception as e:
+                    logging.error(f"Unloading {resource.name} failed: {e}")
+                    continue
+                resource.unloads += 1
+                unloaded.append((resource.name, now - resource.last_used, before))
+        if unloaded:
+            release_memory()
+        for name, idle, before in unloaded:
+            after = self._event(name, 'unload')
+            logging.info(f"Unloaded {name} after {idle / 60:.1f} min idle: RSS {format_mb(before)} -> {format_mb(after)}")
+        return [name for name, _, _ in unloaded]
+
+    def _event(self, name, kind):
+        rss = rss_mb()
+        with self._lock:
+            self.events.append((time.time(), name, kind, rss))
+            del self.events[:-100]
+        if kind == 'load':
+            logging.info(f"Reloaded {name} after idle unload: RSS {format_mb(rss)}")
+        return rss
+
+    def summary(self):
+        with self._lock:
+            return ', '.join(f"{r.name} {'loaded' if r.is_loaded() else 'unloaded'} "
+                             f"({r.loads} reloads, {r.unloads} unloads)" for r in self._resources.values())
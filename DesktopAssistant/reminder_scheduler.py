@@ -0,0 +1,87 @@
+import heapq
+import logging
+import sqlite3
+import threading
+import time
+
+# Longest single sleep; re-checking the heap head this often keeps wall-clock due times honest
+# across suspend/resume and clock changes, which the loop's monotonic clock does not see
+MAX_SLEEP = 300
+
+
+class ReminderScheduler:
+    """Reminders in a min-heap, persisted to SQLite, fired by one loop.call_at timer for the earliest due time.
+
+    on_due(text, due, late) is called on the event loop thread; due is a Unix timestamp and late is how
+    many seconds after it the reminder fired (large for reminders recovered after a restart).
+    """
+    def __init__(self, path, on_due):
+        self.path = path
+        self.on_due = on_due
+        self.loop = None
+        self._heap = []  # (due, id, text)
+        self._timer = None
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS reminders "
+                         "(id INTEGER PRIMARY KEY AUTOINCREMENT, due REAL NOT NULL, text TEXT NOT NULL)")
+        self._db.commit()
+
+    def start(self, loop):
+        """Load stored reminders and arm the timer on loop; overdue ones fire right away"""
+        with self._lock:
+            self._heap = [(due, id_, text) for id_, due, text in
+                          self._db.execute("SELECT id, due, text FROM reminders")]
+            heapq.heapify(self._heap)
+            overdue = sum(1 for due, _, _ in self._heap if due <= time.time())
+        self.loop = loop
+        logging.info(f"Reminders loaded from {self.path}: {len(self._heap)} pending, {overdue} overdue")
+        loop.call_soon_threadsafe(self._arm)
+
+    def add(self, text, due):
+        """Store a reminder due at Unix time due; safe to call from any thread"""
+        with self._lock:
+            cursor = self._db.execute("INSERT INTO reminders (due, text) VALUES (?, ?)", (due, text))
+            self._db.commit()
+            heapq.heappush(self._heap, (due, cursor.lastrowid, text))
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._arm)
+        return cursor.lastrowid
+
+    def pending(self):
+        with self._lock:
+            return len(self._heap)
+
+    def _arm(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        with self._lock:
+            if not self._heap:
+                return
+            delay = self._heap[0][0] - time.time()
+        self._timer = self.loop.call_at(self.loop.time() + min(max(delay, 0), MAX_SLEEP), self._fire)
+
+    def _fire(self):
+        self._timer = None
+        now = time.time()
+        due_now = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due_now.append(heapq.heappop(self._heap))
+            if due_now:
+                self._db.executemany("DELETE FROM reminders WHERE id = ?", [(id_,) for _, id_, _ in due_now])
+                self._db.commit()
+        for due, _, text in due_now:
+            logging.info(f"Reminder triggered {now - due:.1f} s after due time: {text}")
+            try:
+                self.on_due(text, due, now - due)
+            except Exception as e:
+                logging.error(f"Reminder callback error: {e}")
+        self._arm()
+
+    def close(self):
+        if self._timer is not None and self.loop is not None:
+            self.loop.call_soon_threadsafe(self._timer.cancel)
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,94 @@
+import collections
+import difflib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+_NON_WORD = re.compile(r"[^\w\s']+")
+_SPACES = re.compile(r'\s+')
+
+
+def normalize(text):
+    """Lowercase, drop punctuation and collapse whitespace so trivially different prompts share a key"""
+    return _SPACES.sub(' ', _NON_WORD.sub(' ', text.lower())).strip()
+
+
+class ResponseCache:
+    """LRU + TTL cache of answers keyed by normalized prompt, with optional fuzzy lookup and a JSON file on disk"""
+    def __init__(self, max_entries=256, ttl=86400, fuzzy_cutoff=0, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.path = path
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()  # key -> (answer, stored_at)
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def get(self, prompt):
+        key = normalize(prompt)
+        with self._lock:
+            self._expire()
+            match = key if key in self._entries else None
+            if match is None and self.fuzzy_cutoff:
+                close = difflib.get_close_matches(key, list(self._entries), n=1, cutoff=self.fuzzy_cutoff)
+                match = close[0] if close else None
+                if match is not None:
+                    self.fuzzy_hits += 1
+            if match is None:
+                self.misses += 1
+                logging.info(f"Response cache miss ({self.stats()})")
+                return None
+            self.hits += 1
+            self._entries.move_to_end(match)
+            logging.info(f"Response cache hit for '{match}' ({self.stats()})")
+            return self._entries[match][0]
+
+    def put(self, prompt, answer):
+        key = normalize(prompt)
+        if not key:
+            return
+        with self._lock:
+            self._entries[key] = (answer, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.path:
+                self._save()
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"hits={self.hits} (fuzzy {self.fuzzy_hits}), misses={self.misses}, hit rate {rate:.0f}%, size={len(self._entries)}"
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for key in [k for k, (_, stored_at) in self._entries.items() if stored_at < cutoff]:
+            del self._entries[key]
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for key, answer, stored_at in json.load(f):
+                    self._entries[key] = (answer, stored_at)
+            self._expire()
+            logging.info(f"Response cache loaded {len(self._entries)} entries from {self.path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"Could not load response cache: {e}")
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump([[k, answer, stored_at] for k, (answer, stored_at) in self._entries.items()], f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.warning(f"Could not save response cache: {e}")
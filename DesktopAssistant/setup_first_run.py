@@ -49,7 +49,8 @@ def create_env_file():
     recognition_mode = simpledialog.askstring("Setup", 
         "Voice recognition mode:\n\n" +
         "Enter 'offline' for local recognition (recommended)\n" +
-        "Enter 'cloud' for Google Cloud recognition\n\n" +
+        "Enter 'cloud' for Google Cloud recognition\n" +
+        "Enter 'hybrid' to race both and use the first confident result\n\n" +
         "Default: offline", 
         initialvalue="offline")
     env_content.append(f"RECOGNITION_MODE={recognition_mode or 'offline'}")
@@ -0,0 +1,71 @@
+import json
+import socket
+import threading
+
+import pytest
+
+from assistant_server import AssistantServer
+
+
+@pytest.fixture
+def server():
+    commands = []
+
+    def run_command(text, speak_aloud):
+        commands.append(text)
+        return {'intent': 'time', 'reply': f"ran {text}"}
+
+    api = AssistantServer(run_command, transcribe=lambda pcm, rate: '', health=lambda: {'status': 'ok'},
+                          port=0, token='secret')
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    api.commands = commands
+    yield api
+    api.shutdown()
+
+
+def exchange(server, raw):
+    """Send raw bytes on one keep-alive connection and return everything the server writes back"""
+    with socket.create_connection(server.address, timeout=2) as sock:
+        sock.sendall(raw)
+        data = b''
+        try:
+            while chunk := sock.recv(65536):
+                data += chunk
+        except socket.timeout:
+            pass
+    return data
+
+
+def post(path, body, token='secret', extra=''):
+    return (f"POST {path} HTTP/1.1\r\nHost: x\r\nAuthorization: Bearer {token}\r\n{extra}"
+            f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+def test_command_runs_with_the_right_token(server):
+    reply = exchange(server, post('/command', json.dumps({'text': 'what time is it'}).encode(),
+                                  extra='Connection: close\r\n'))
+    assert reply.startswith(b'HTTP/1.1 200')
+    assert server.commands == ['what time is it']
+
+
+def test_rejected_request_body_is_not_parsed_as_a_second_request(server):
+    smuggled = b"GET /health HTTP/1.1\r\nHost: x\r\nAuthorization: Bearer secret\r\n\r\n"
+    reply = exchange(server, post('/command', smuggled, token='wrong'))
+    assert reply.startswith(b'HTTP/1.1 401')
+    assert b'Connection: close' in reply
+    assert reply.count(b'HTTP/1.1 ') == 1
+
+
+def test_oversized_body_closes_the_connection(server, monkeypatch):
+    monkeypatch.setattr('assistant_server.MAX_BODY_BYTES', 10)
+    reply = exchange(server, post('/command', b'{"text": "what time is it"}'))
+    assert reply.startswith(b'HTTP/1.1 413')
+    assert reply.count(b'HTTP/1.1 ') == 1
+    assert server.commands == []
+
+
+def test_invalid_content_length_is_a_bad_request(server):
+    raw = b"POST /command HTTP/1.1\r\nHost: x\r\nAuthorization: Bearer secret\r\nContent-Length: abc\r\n\r\n"
+    reply = exchange(server, raw)
+    assert reply.startswith(b'HTTP/1.1 400')
+    assert b'Invalid Content-Length' in reply
@@ -0,0 +1,173 @@
+import json
+import threading
+import time
+import types
+
+import pytest
+
+import cloud_speech
+from audio_capture import SpeechPipeline, Utterance
+from cloud_speech import CloudRecognizer
+
+
+class FakeSpeechModule:
+    """Just enough of google.cloud.speech to build requests and the streaming config"""
+    class RecognitionConfig:
+        class AudioEncoding:
+            LINEAR16 = 'LINEAR16'
+
+        def __init__(self, **kwargs):
+            self.__dict__.update(kwargs)
+
+    class StreamingRecognitionConfig:
+        def __init__(self, **kwargs):
+            self.__dict__.update(kwargs)
+
+    class StreamingRecognizeRequest:
+        def __init__(self, audio_content):
+            self.audio_content = audio_content
+
+
+def response(*results):
+    """StreamingRecognizeResponse with (transcript, confidence, is_final) results"""
+    return types.SimpleNamespace(results=[
+        types.SimpleNamespace(is_final=is_final,
+                              alternatives=[types.SimpleNamespace(transcript=text, confidence=confidence)])
+        for text, confidence, is_final in results
+    ])
+
+
+class FakeSpeechClient:
+    """Local stand-in for the gRPC streaming_recognize service.
+
+    It consumes the request stream like the real channel does, records the audio it received and
+    answers with the canned responses, optionally after a delay or with an error.
+    """
+    def __init__(self, responses=(), delay=0.0, error=None):
+        self.responses = list(responses)
+        self.delay = delay
+        self.error = error
+        self.audio = []
+        self.configs = []
+
+    def streaming_recognize(self, config, requests):
+        self.configs.append(config)
+        for request in requests:
+            self.audio.append(request.audio_content)
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return iter(self.responses)
+
+
+class FakeKaldiRecognizer:
+    """Vosk recognizer double that fails if two threads use it at once"""
+    def __init__(self, text, confidence, delay_per_chunk=0.0):
+        self.text = text
+        self.confidence = confidence
+        self.delay_per_chunk = delay_per_chunk
+        self.busy = threading.Lock()
+        self.overlapped = False
+
+    def _enter(self):
+        if not self.busy.acquire(blocking=False):
+            self.overlapped = True
+            return False
+        return True
+
+    def Reset(self):
+        if self._enter():
+            self.busy.release()
+
+    def AcceptWaveform(self, data):
+        if self._enter():
+            time.sleep(self.delay_per_chunk)
+            self.busy.release()
+
+    def FinalResult(self):
+        words = [{'word': word, 'conf': self.confidence} for word in self.text.split()]
+        return json.dumps({'text': self.text, 'result': words})
+
+
+@pytest.fixture(autouse=True)
+def fake_speech(monkeypatch):
+    monkeypatch.setattr(cloud_speech, 'speech', FakeSpeechModule)
+
+
+def make_utterance(chunks=5):
+    utterance = Utterance(chunk_ms=100)
+    for i in range(chunks):
+        utterance.append(bytes([i]) * 3200)
+    utterance.close()
+    return utterance
+
+
+def make_pipeline(cloud, rec, min_confidence=0.6):
+    pipeline = SpeechPipeline(None, None, mode='hybrid', cloud=cloud, min_confidence=min_confidence)
+    pipeline._vosk_model = object()
+    pipeline._rec = rec
+    return pipeline
+
+
+def test_recognize_joins_final_results_with_mean_confidence():
+    client = FakeSpeechClient([
+        response(("What", 0.5, False)),
+        response(("What time", 0.8, True)),
+        response(("Is It", 0.6, True)),
+    ])
+    command, confidence = CloudRecognizer(client=client).recognize(iter([b'a', b'b']))
+    assert command == "what time is it"
+    assert confidence == pytest.approx(0.7)
+
+
+def test_recognize_streams_every_chunk_with_the_session_config():
+    client = FakeSpeechClient([response(("hello", 0.9, True))])
+    recognizer = CloudRecognizer(rate=8000, client=client)
+    utterance = make_utterance(3)
+    recognizer.recognize(utterance.chunks())
+    recognizer.recognize(utterance.chunks())
+    assert client.audio == list(utterance.chunks()) * 2
+    assert client.configs[0] is client.configs[1]
+    assert client.configs[0].config.sample_rate_hertz == 8000
+
+
+def test_recognize_without_final_results_is_empty():
+    client = FakeSpeechClient([response(("maybe", 0.4, False))])
+    assert CloudRecognizer(client=client).recognize(iter([b'a'])) == ('', 0.0)
+
+
+def test_recognize_propagates_service_errors():
+    client = FakeSpeechClient(error=RuntimeError("UNAVAILABLE"))
+    with pytest.raises(RuntimeError, match="UNAVAILABLE"):
+        CloudRecognizer(client=client).recognize(iter([b'a']))
+
+
+def test_hybrid_cloud_wins_and_vosk_is_finished_before_returning():
+    cloud = CloudRecognizer(client=FakeSpeechClient([response(("weather in paris", 0.95, True))]))
+    rec = FakeKaldiRecognizer("whether in paris", 0.9, delay_per_chunk=0.05)
+    pipeline = make_pipeline(cloud, rec)
+    assert pipeline._decode_hybrid(make_utterance(20)) == "weather in paris"
+    # The cancelled Vosk pass must not still hold the shared recognizer
+    assert not rec.busy.locked()
+    pipeline._decode_hybrid(make_utterance(20))
+    assert not rec.overlapped
+
+
+def test_hybrid_offline_wins_when_cloud_is_slow():
+    cloud = CloudRecognizer(client=FakeSpeechClient([response(("late answer", 0.99, True))], delay=0.5))
+    pipeline = make_pipeline(cloud, FakeKaldiRecognizer("what time is it", 0.9))
+    start = time.perf_counter()
+    assert pipeline._decode_hybrid(make_utterance()) == "what time is it"
+    assert time.perf_counter() - start < 0.5
+
+
+def test_hybrid_falls_back_to_a_low_confidence_transcript():
+    cloud = CloudRecognizer(client=FakeSpeechClient([response(("tell me a joke", 0.3, True))], delay=0.1))
+    pipeline = make_pipeline(cloud, FakeKaldiRecognizer("", 0.0))
+    assert pipeline._decode_hybrid(make_utterance()) == "tell me a joke"
+
+
+def test_hybrid_uses_vosk_when_the_cloud_fails():
+    cloud = CloudRecognizer(client=FakeSpeechClient(error=RuntimeError("DEADLINE_EXCEEDED")))
+    pipeline = make_pipeline(cloud, FakeKaldiRecognizer("latest news", 0.4))
+    assert pipeline._decode_hybrid(make_utterance()) == "latest news"
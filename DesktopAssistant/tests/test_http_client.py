@@ -0,0 +1,153 @@
+import asyncio
+import collections
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+requests = pytest.importorskip('requests')
+pytest.importorskip('aiohttp')
+
+from http_client import HttpClient
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Local API stand-in: /data/<name> answers JSON, /slow/<name> answers after 0.3 s, anything else 404"""
+    hits = collections.Counter()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        with self.lock:
+            self.hits[path] += 1
+        if path.startswith('/slow/'):
+            time.sleep(0.3)
+        elif not path.startswith('/data/'):
+            self.send_error(404)
+            return
+        data = json.dumps({'path': path, 'query': self.path.partition('?')[2]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    StandInHandler.hits.clear()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def client():
+    client = HttpClient(retries=0)
+    yield client
+    client.close()
+
+
+def test_get_json_returns_status_and_data(server, client):
+    status, data = client.get_json(f"{server}/data/weather", params={'q': 'Nairobi'})
+    assert status == 200
+    assert data == {'path': '/data/weather', 'query': 'q=Nairobi'}
+
+
+def test_responses_are_cached_until_the_ttl_expires(server, client):
+    url = f"{server}/data/weather"
+    first = client.get_json(url, ttl=0.3)
+    assert client.get_json(url, ttl=0.3) == first
+    assert StandInHandler.hits['/data/weather'] == 1
+    time.sleep(0.4)
+    client.get_json(url, ttl=0.3)
+    assert StandInHandler.hits['/data/weather'] == 2
+    assert (client.hits, client.misses) == (1, 2)
+
+
+def test_params_are_part_of_the_cache_key(server, client):
+    url = f"{server}/data/weather"
+    client.get_json(url, params={'q': 'Paris'}, ttl=60)
+    client.get_json(url, params={'q': 'London'}, ttl=60)
+    assert StandInHandler.hits['/data/weather'] == 2
+
+
+def test_uncached_without_ttl_and_errors_are_never_cached(server, client):
+    client.get_json(f"{server}/data/news")
+    client.get_json(f"{server}/data/news")
+    assert client.get_json(f"{server}/missing", ttl=60) == (404, None)
+    assert client.get_json(f"{server}/missing", ttl=60) == (404, None)
+    assert StandInHandler.hits['/data/news'] == 2
+    assert StandInHandler.hits['/missing'] == 2
+
+
+def test_cache_is_bounded_and_evicts_least_recently_used(server):
+    client = HttpClient(max_cache_entries=2, retries=0)
+    for name in ('a', 'b', 'a', 'c'):  # reading a again makes b the least recently used
+        client.get_json(f"{server}/data/{name}", ttl=60)
+    client.get_json(f"{server}/data/a", ttl=60)
+    client.get_json(f"{server}/data/b", ttl=60)
+    assert StandInHandler.hits['/data/a'] == 1
+    assert StandInHandler.hits['/data/b'] == 2
+    client.close()
+
+
+def test_concurrent_identical_gets_share_one_request(server, client):
+    url = f"{server}/slow/forecast"
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: client.get_json(url), range(5)))
+    assert StandInHandler.hits['/slow/forecast'] == 1
+    assert client.coalesced == 4
+    assert all(result == results[0] for result in results)
+
+
+def test_read_timeout_raises_for_every_waiter(server, client):
+    url = f"{server}/slow/timeout"
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(client.get_json, url, timeout=(1, 0.1)) for _ in range(3)]
+        for future in futures:
+            with pytest.raises(requests.exceptions.RequestException):
+                future.result()
+    assert time.perf_counter() - start < 0.3
+    assert StandInHandler.hits['/slow/timeout'] == 1
+
+
+def test_async_get_shares_cache_and_coalesces(server, client):
+    url = f"{server}/slow/async"
+
+    async def run():
+        try:
+            results = await asyncio.gather(*(client.get_json_async(url, ttl=60) for _ in range(4)))
+            cached = await client.get_json_async(url, ttl=60)
+            return results, cached
+        finally:
+            await client.close_async()
+
+    results, cached = asyncio.run(run())
+    assert results[0][0] == 200
+    assert all(result == results[0] for result in results)
+    assert cached == results[0]
+    assert client.get_json(url, ttl=60) == results[0]  # the blocking call reads the same cache
+    assert StandInHandler.hits['/slow/async'] == 1
+    assert client.coalesced == 3
+
+
+def test_async_timeout_raises(server, client):
+    async def run():
+        try:
+            await client.get_json_async(f"{server}/slow/async-timeout", timeout=(1, 0.1))
+        finally:
+            await client.close_async()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
@@ -0,0 +1,46 @@
+from ui_bus import UiBus
+
+
+class FakeRoot:
+    """Tk root stand-in that records after() callbacks instead of running a main loop"""
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, func):
+        self.scheduled.append(func)
+
+    def run_pending(self):
+        pending, self.scheduled = self.scheduled, []
+        for func in pending:
+            func()
+
+
+class BrokenView:
+    def __init__(self):
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+        raise RuntimeError("widget destroyed")
+
+
+def test_failing_calls_and_views_do_not_stop_the_pump():
+    root = FakeRoot()
+    bus = UiBus(root)
+    view = BrokenView()
+    bus.add_view(view)
+    bus.start()
+    applied = []
+
+    def fail():
+        raise RuntimeError("bad update")
+
+    bus.call(fail)
+    bus.call(applied.append, 1)
+    root.run_pending()
+    assert applied == [1]
+    assert len(root.scheduled) == 1  # re-armed despite both failures
+    bus.call(applied.append, 2)
+    root.run_pending()
+    assert applied == [1, 2]
+    assert view.flushes == 2
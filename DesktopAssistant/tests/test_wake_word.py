@@ -0,0 +1,145 @@
+import json
+import types
+
+import pytest
+
+import audio_capture
+from audio_capture import SpeechPipeline, Utterance, WakeWordGate
+
+RATE = 16000
+CHUNK = 3200  # 100 ms
+
+
+class FakeModel:
+    def __init__(self, vocabulary=('ovo', 'what', 'time', 'is', 'it')):
+        self.vocabulary = set(vocabulary)
+
+    def find_word(self, word):
+        return 1 if word in self.vocabulary else -1
+
+
+class FakeRecognizer:
+    """Vosk double: the grammar recognizer hears 'ovo' in the first 0.5 s when the audio starts with b'W',
+    the full recognizer returns FakeRecognizer.text and records the audio it was given.
+
+    Like Vosk, word times count from the start of the recognizer's whole stream; Reset() and
+    FinalResult() do not set them back to zero.
+    """
+    text = "what time is it"
+    instances = []
+
+    def __init__(self, model, rate, grammar=None):
+        self.grammar = grammar
+        self.audio = b''
+        self.stream_seconds = 0.0
+        FakeRecognizer.instances.append(self)
+
+    def SetWords(self, enabled):
+        pass
+
+    def Reset(self):
+        self.audio = b''
+
+    def AcceptWaveform(self, data):
+        self.audio += data
+        self.stream_seconds += len(data) / 2 / RATE
+
+    def FinalResult(self):
+        if self.grammar is not None:
+            began = self.stream_seconds - len(self.audio) / 2 / RATE
+            heard = self.audio[:1] == b'W'
+            self.audio = b''
+            words = [{'word': 'ovo', 'conf': 0.9, 'start': began + 0.1, 'end': began + 0.5}] if heard else []
+            return json.dumps({'text': ' '.join(w['word'] for w in words), 'result': words})
+        text = self.text if self.audio else ''
+        return json.dumps({'text': text, 'result': [{'word': w, 'conf': 0.9} for w in text.split()]})
+
+
+@pytest.fixture(autouse=True)
+def fake_vosk(monkeypatch):
+    FakeRecognizer.instances = []
+    FakeRecognizer.text = "what time is it"
+    monkeypatch.setattr(audio_capture, 'vosk', types.SimpleNamespace(Model=lambda path: FakeModel(),
+                                                                      KaldiRecognizer=FakeRecognizer))
+
+
+def make_utterance(seconds, wake=False):
+    utterance = Utterance(chunk_ms=100)
+    for i in range(int(seconds * 10)):
+        utterance.append((b'W' if wake and i == 0 else b'x') * CHUNK)
+    utterance.close()
+    return utterance
+
+
+def make_pipeline(gate, notices=None, woken=None):
+    capture = types.SimpleNamespace(rate=RATE)
+    pipeline = SpeechPipeline(capture, None, mode='offline', vosk_model_path='model', wake_gate=gate,
+                              notify=notices.append if notices is not None else None,
+                              on_wake=(lambda: woken.append(True)) if woken is not None else None)
+    pipeline.load()
+    return pipeline
+
+
+def full_recognizer():
+    return next(rec for rec in FakeRecognizer.instances if rec.grammar is None)
+
+
+def test_phrase_missing_from_vocabulary_raises():
+    with pytest.raises(ValueError, match="hey, jarvis not in"):
+        WakeWordGate('hey jarvis').load(FakeModel(), RATE)
+
+
+def test_pipeline_disables_the_gate_loudly_when_the_phrase_is_unknown():
+    notices = []
+    pipeline = make_pipeline(WakeWordGate('jarvis'), notices)
+    assert pipeline.wake_gate is None
+    assert any('jarvis' in notice for notice in notices)
+    pipeline._decode_utterance(make_utterance(1.5))
+    assert pipeline.get_utterance(0)[0] == "what time is it"
+
+
+def test_unaddressed_speech_never_reaches_the_full_recognizer():
+    pipeline = make_pipeline(WakeWordGate('ovo'))
+    pipeline._decode_utterance(make_utterance(1.5))
+    assert pipeline.get_utterance(0) == (None, None)
+    assert full_recognizer().audio == b''
+
+
+def test_full_recognizer_starts_after_the_wake_phrase():
+    gate = WakeWordGate('ovo')
+    pipeline = make_pipeline(gate)
+    pipeline._decode_utterance(make_utterance(1.5, wake=True))
+    assert pipeline.get_utterance(0)[0] == "what time is it"
+    assert len(full_recognizer().audio) == int(1.5 * RATE) * 2 - int(0.5 * RATE) * 2
+    assert gate.awake
+
+
+def test_follow_up_inside_the_window_needs_no_wake_phrase():
+    gate = WakeWordGate('ovo')
+    pipeline = make_pipeline(gate)
+    gate.extend()
+    pipeline._decode_utterance(make_utterance(1.5))
+    assert pipeline.get_utterance(0)[0] == "what time is it"
+    assert gate.checked == 0
+
+
+def test_bare_wake_word_opens_the_window():
+    woken = []
+    gate = WakeWordGate('ovo')
+    pipeline = make_pipeline(gate, woken=woken)
+    FakeRecognizer.text = ""
+    pipeline._decode_utterance(make_utterance(0.6, wake=True))
+    assert woken == [True]
+    assert pipeline.get_utterance(0) == (None, None)
+    assert gate.awake
+
+
+def test_every_wake_detection_cuts_at_its_own_utterance():
+    gate = WakeWordGate('ovo')
+    pipeline = make_pipeline(gate)
+    for _ in range(3):
+        gate._open_until = 0.0  # let the window lapse so each utterance needs the wake word again
+        pipeline._decode_utterance(make_utterance(1.5, wake=True))
+        assert pipeline.get_utterance(0)[0] == "what time is it"
+        assert len(full_recognizer().audio) == int(1.5 * RATE) * 2 - int(0.5 * RATE) * 2
+    assert gate.detected == 3
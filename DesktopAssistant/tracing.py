@@ -0,0 +1,149 @@
+import collections
+import contextvars
+import itertools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW = 1000  # samples kept per stage for the rolling percentiles
+RECENT_TRACES = 50
+MAX_SPANS = 100  # per trace; streamed replies add a TTS span per sentence
+
+_current = contextvars.ContextVar('trace_id', default=None)
+_ids = itertools.count(1)
+
+
+class Histogram:
+    """Rolling window of latencies plus lifetime count and sum"""
+    def __init__(self, window=WINDOW):
+        self.samples = collections.deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+        self.total += ms
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+
+class Tracer:
+    """Trace IDs for commands, per-stage spans and rolling latency percentiles"""
+    def __init__(self):
+        self.stages = collections.OrderedDict()  # stage -> Histogram
+        self.traces = collections.OrderedDict()  # trace_id -> {'kind', 'text', 'started_at', 'spans'}
+        self.values = collections.OrderedDict()  # name -> latest value of a gauge such as batch size
+        self._lock = threading.Lock()
+
+    def new_trace(self, kind, text='', started_at=None):
+        """Start a trace for one voice or typed command and return its ID"""
+        trace_id = f"{kind[0]}{next(_ids):05d}"
+        with self._lock:
+            self.traces[trace_id] = {'kind': kind, 'text': text, 'started_at': started_at or time.perf_counter(),
+                                     'spans': []}
+            while len(self.traces) > RECENT_TRACES:
+                self.traces.popitem(last=False)
+        return trace_id
+
+    def record(self, stage, ms, trace_id=None):
+        """Add a finished span; trace_id defaults to the trace of the current context"""
+        trace_id = trace_id or _current.get()
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.add(ms)
+            trace = self.traces.get(trace_id)
+            if trace is not None and len(trace['spans']) < MAX_SPANS:
+                trace['spans'].append((stage, round(ms, 1)))
+
+    def set_value(self, name, value):
+        """Set a gauge that is not a latency, e.g. LLM batch size or tokens per second"""
+        with self._lock:
+            self.values[name] = value
+
+    def elapsed_ms(self, trace_id):
+        """Milliseconds since the trace started, or None for an unknown trace"""
+        with self._lock:
+            trace = self.traces.get(trace_id)
+        return (time.perf_counter() - trace['started_at']) * 1000 if trace else None
+
+    @contextmanager
+    def span(self, stage, trace_id=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - start) * 1000, trace_id)
+
+    def snapshot(self):
+        with self._lock:
+            stages = {}
+            for stage, histogram in self.stages.items():
+                quantiles = histogram.quantiles()
+                stages[stage] = {
+                    'count': histogram.count,
+                    'mean_ms': round(histogram.total / histogram.count, 1),
+                    **{f"p{int(q * 100)}_ms": round(value, 1) for q, value in quantiles.items()},
+                }
+            traces = [{'id': trace_id, 'kind': trace['kind'], 'text': trace['text'], 'spans': list(trace['spans'])}
+                      for trace_id, trace in self.traces.items()]
+            values = dict(self.values)
+        return {'stages': stages, 'values': values, 'traces': traces}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Prometheus text exposition: one summary per stage, in milliseconds"""
+        lines = ["# HELP ovo_stage_latency_ms Latency of each command stage in milliseconds",
+                 "# TYPE ovo_stage_latency_ms summary"]
+        with self._lock:
+            for stage, histogram in self.stages.items():
+                for q, value in histogram.quantiles().items():
+                    lines.append(f'ovo_stage_latency_ms{{stage="{stage}",quantile="{q}"}} {value:.3f}')
+                lines.append(f'ovo_stage_latency_ms_sum{{stage="{stage}"}} {histogram.total:.3f}')
+                lines.append(f'ovo_stage_latency_ms_count{{stage="{stage}"}} {histogram.count}')
+            for name, value in self.values.items():
+                lines.append(f"# TYPE ovo_{name} gauge")
+                lines.append(f"ovo_{name} {value:.3f}")
+        return '\n'.join(lines) + '\n'
+
+    def format_table(self):
+        """Plain-text table of stage percentiles and the latest traces for the debug panel"""
+        snapshot = self.snapshot()
+        lines = [f"{'stage':<22}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}"]
+        for stage, s in snapshot['stages'].items():
+            lines.append(f"{stage:<22}{s['count']:>7}{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}")
+        if snapshot['values']:
+            lines.append("")
+            lines.extend(f"{name:<22}{value:>16.1f}" for name, value in snapshot['values'].items())
+        lines.append("")
+        lines.append("Recent traces (ms):")
+        for trace in reversed(snapshot['traces'][-10:]):
+            spans = ', '.join(f"{stage} {ms:.0f}" for stage, ms in trace['spans'])
+            lines.append(f"{trace['id']} {trace['text'][:30]!r}: {spans}")
+        return '\n'.join(lines)
+
+
+def current_trace():
+    return _current.get()
+
+
+def set_trace(trace_id):
+    """Make trace_id the current trace in this thread or task; returns a token for reset_trace"""
+    return _current.set(trace_id)
+
+
+def reset_trace(token):
+    _current.reset(token)
+
+
+tracer = Tracer()
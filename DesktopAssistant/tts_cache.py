@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import wave
+
+from lazy_loader import lazy_import
+
+pyaudio = lazy_import('pyaudio')
+
+PLAYBACK_FRAMES = 1024
+
+
+class TTSCache:
+    """Size-bounded directory of phrases rendered to WAV with engine.save_to_file, keyed by text, rate, volume and voice.
+
+    render() must run on the thread that owns the pyttsx3 engine. Least recently played files are evicted
+    once the directory grows past max_bytes.
+    """
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, rate=150, volume=0.9, voice=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.settings = f"{rate}|{volume}|{voice}"
+        self.hits = 0
+        self.misses = 0
+        self.supported = True
+        self._audio = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._sizes = {}
+        for name in os.listdir(directory):
+            if name.endswith('.wav'):
+                path = os.path.join(directory, name)
+                self._sizes[path] = os.path.getsize(path)
+
+    def path_for(self, text):
+        key = hashlib.sha1(f"{self.settings}|{text}".encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + '.wav')
+
+    def get(self, text):
+        """Return the cached WAV path for text, or None"""
+        path = self.path_for(text)
+        with self._lock:
+            if path not in self._sizes:
+                self.misses += 1
+                return None
+            self.hits += 1
+        try:
+            os.utime(path)  # mtime doubles as the LRU timestamp
+        except OSError:
+            with self._lock:
+                self._sizes.pop(path, None)
+            return None
+        return path
+
+    def contains(self, text):
+        with self._lock:
+            return self.path_for(text) in self._sizes
+
+    def render(self, engine, text):
+        """Synthesize text into the cache and return its path, or None if the driver's output is not WAV"""
+        if not self.supported:
+            return None
+        path = self.path_for(text)
+        tmp_path = path + '.tmp'
+        start = time.perf_counter()
+        try:
+            engine.save_to_file(text, tmp_path)
+            engine.runAndWait()
+            with wave.open(tmp_path, 'rb') as f:
+                if f.getnframes() == 0:
+                    raise wave.Error("empty render")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            if isinstance(e, (wave.Error, EOFError)):
+                self.supported = False
+            logging.warning(f"TTS cache could not render '{text}': {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return None
+        with self._lock:
+            self._sizes[path] = os.path.getsize(path)
+        logging.info(f"TTS cache rendered '{text}' in {(time.perf_counter() - start) * 1000:.0f} ms")
+        self._evict()
+        return path
+
+    def play(self, path, stop_event=None):
+        """Play a cached WAV file, stopping early once stop_event is set"""
+        if self._audio is None:
+            self._audio = pyaudio.PyAudio()
+        with wave.open(path, 'rb') as f:
+            stream = self._audio.open(format=self._audio.get_format_from_width(f.getsampwidth()),
+                                      channels=f.getnchannels(), rate=f.getframerate(), output=True)
+            try:
+                data = f.readframes(PLAYBACK_FRAMES)
+                while data and not (stop_event is not None and stop_event.is_set()):
+                    stream.write(data)
+                    data = f.readframes(PLAYBACK_FRAMES)
+            finally:
+                stream.stop_stream()
+                stream.close()
+
+    def stats(self):
+        with self._lock:
+            return (f"hits={self.hits}, misses={self.misses}, files={len(self._sizes)}, "
+                    f"{sum(self._sizes.values()) / 1024 / 1024:.1f} MB")
+
+    def _evict(self):
+        with self._lock:
+            total = sum(self._sizes.values())
+            if total <= self.max_bytes:
+                return
+            by_age = sorted(self._sizes, key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+            for path in by_age:
+                if total <= self.max_bytes:
+                    break
+                total -= self._sizes.pop(path)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        logging.info(f"TTS cache evicted to {total / 1024 / 1024:.1f} MB")
+
+    def close(self):
+        if self._audio is not None:
+            self._audio.terminate()
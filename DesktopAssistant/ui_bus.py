@@ -0,0 +1,73 @@
+import logging
+import queue
+import threading
+
+
+class UiBus:
+    """Marshals GUI updates from any thread onto the Tk main loop and applies them in batches.
+
+    Worker threads call call(); a pump scheduled with after() on the main thread runs the queued calls
+    every interval_ms and then lets each registered view flush its buffered output once.
+    """
+    def __init__(self, root, interval_ms=50, max_batch=500):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.max_batch = max_batch
+        self._calls = queue.SimpleQueue()
+        self._views = []
+
+    def call(self, func, *args):
+        self._calls.put((func, args))
+
+    def add_view(self, view):
+        self._views.append(view)
+
+    def start(self):
+        self.root.after(self.interval_ms, self._pump)
+
+    def _pump(self):
+        # One failing update is logged and skipped; the pump must always re-arm or the GUI freezes
+        try:
+            for _ in range(self.max_batch):
+                try:
+                    func, args = self._calls.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    func(*args)
+                except Exception as e:
+                    logging.error(f"GUI update {getattr(func, '__name__', func)} failed: {e}")
+            for view in self._views:
+                try:
+                    view.flush()
+                except Exception as e:
+                    logging.error(f"GUI view flush failed: {e}")
+        finally:
+            self.root.after(self.interval_ms, self._pump)
+
+
+class ChatView:
+    """Chat textbox that buffers appends from any thread and keeps only the last max_lines in the widget,
+    so insert and layout cost stays flat however long the session runs"""
+    def __init__(self, textbox, max_lines=500):
+        self.textbox = textbox
+        self.max_lines = max_lines
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def append(self, text):
+        with self._lock:
+            self._pending.append(text)
+
+    def flush(self):
+        """Insert everything appended since the last flush in one go; main thread only"""
+        with self._lock:
+            if not self._pending:
+                return
+            text = ''.join(self._pending)
+            self._pending = []
+        self.textbox.insert("end", text)
+        lines = int(self.textbox.index("end-1c").split('.')[0])
+        if self.max_lines and lines > self.max_lines:
+            self.textbox.delete("1.0", f"{lines - self.max_lines + 1}.0")
+        self.textbox.see("end")